@@ -2,10 +2,12 @@ import logging
 import asyncio
 import os
 import time
-import json
+import re
+import functools
 import datetime
 import traceback
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update
 from telegram.ext import (
     ApplicationBuilder,
@@ -16,6 +18,8 @@ from telegram.ext import (
 )
 import config
 from core.agent import Agent
+from core.fileio import atomic_write_bytes, ensure_dir, json_dumps, json_loads
+from core.http import close_sessions
 from core.tools import ToolRegistry
 from core.watcher import ModuleWatcher
 from core.ui.telegram_renderer import TelegramRenderer
@@ -25,19 +29,21 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 
-# Initialize Tools
+# Initialize Tools and Agent
+# Tool modules pull in heavy imports; build the agent and its API clients meanwhile
 registry = ToolRegistry()
-registry.load_modules()
+with ThreadPoolExecutor(max_workers=1) as _startup_pool:
+    _modules_loaded = _startup_pool.submit(registry.load_modules)
+    agent = Agent(registry)
+    _modules_loaded.result()
 
 # Initialize Watcher
 watcher = ModuleWatcher(registry)
 watcher.start()
 
-# Initialize Agent
-agent = Agent(registry)
-
 # Persistence
-SESSIONS_FILE = "data/sessions.json"
+SESSIONS_FILE = "data/sessions.json"  # Legacy monolithic file, migrated on startup
+SESSIONS_DIR = "data/sessions"
 PROFILE_FILE = "data/profiles.json"
 DOWNLOADS_DIR = "downloads"
 
@@ -50,47 +56,179 @@ def ensure_downloads_dir():
 ensure_downloads_dir()
 
 
-def load_sessions():
-    if os.path.exists(SESSIONS_FILE):
+def _session_path(chat_id):
+    return os.path.join(SESSIONS_DIR, f"{chat_id}.json")
+
+
+def migrate_sessions():
+    """Split the legacy data/sessions.json into one file per chat."""
+    if not os.path.exists(SESSIONS_FILE):
+        return
+    try:
+        with open(SESSIONS_FILE, "rb") as f:
+            sessions = json_loads(f.read())
+        for chat_id, hist in sessions.items():
+            _atomic_write_json(_session_path(chat_id), hist)
+        os.replace(SESSIONS_FILE, SESSIONS_FILE + ".migrated")
+        logging.info(f"Migrated {len(sessions)} sessions to {SESSIONS_DIR}/")
+    except Exception as e:
+        logging.error(f"Session migration failed: {e}")
+
+
+def _load_one(chat_id):
+    path = _session_path(chat_id)
+    if os.path.exists(path):
         try:
-            with open(SESSIONS_FILE, "r") as f:
-                return json.load(f)
+            with open(path, "rb") as f:
+                return json_loads(f.read())
         except:
-            return {}
-    return {}
+            return []
+    return []
+
+
+def get_session(chat_id):
+    """Return the chat's history, loading its file on first access."""
+    chat_id = str(chat_id)
+    if chat_id not in user_sessions:
+        set_session(chat_id, _load_one(chat_id))
+    return user_sessions[chat_id]
+
+
+def set_session(chat_id, history):
+    """Replace the chat's history and rebuild its running token count."""
+    chat_id = str(chat_id)
+    user_sessions[chat_id] = history
+    session_tokens[chat_id] = sum(count_tokens(m.get("content")) for m in history)
+
+
+def append_message(chat_id, message):
+    """Append to the chat's history, keeping the running token count in step."""
+    chat_id = str(chat_id)
+    get_session(chat_id).append(message)
+    session_tokens[chat_id] += count_tokens(message.get("content"))
+
+
+def _atomic_write_json(path, data):
+    """Write JSON via a temp file and rename, so a crash never leaves a torn file."""
+    ensure_dir(os.path.dirname(path))
+    atomic_write_bytes(path, json_dumps(data))
+
+
+def mark_session_dirty(chat_id):
+    """Schedule the session file for the next debounced flush."""
+    _dirty_sessions.add(str(chat_id))
+    _flush_event.set()
 
 
-def save_sessions():
-    if not os.path.exists("data"):
-        os.makedirs("data")
-    with open(SESSIONS_FILE, "w") as f:
-        json.dump(user_sessions, f)
+async def flush_sessions():
+    """Write the changed chats' session files off the event loop."""
+    async with session_lock:
+        if not _dirty_sessions:
+            return
+        snapshot = {chat_id: list(user_sessions.get(chat_id, [])) for chat_id in _dirty_sessions}
+        _dirty_sessions.clear()
+
+    def _write():
+        for chat_id, hist in snapshot.items():
+            _atomic_write_json(_session_path(chat_id), hist)
+
+    try:
+        await asyncio.to_thread(_write)
+    except Exception as e:
+        logging.error(f"Failed to save sessions: {e}")
+
+
+async def session_flusher():
+    """Background task: coalesce session changes into one write per interval."""
+    while True:
+        await _flush_event.wait()
+        _flush_event.clear()
+        await asyncio.sleep(SESSION_FLUSH_INTERVAL)
+        await flush_sessions()
 
 
 def load_profiles():
     if os.path.exists(PROFILE_FILE):
         try:
-            with open(PROFILE_FILE, "r") as f:
-                return json.load(f)
+            with open(PROFILE_FILE, "rb") as f:
+                return json_loads(f.read())
         except:
             return {}
     return {}
 
 
-# In-memory session storage (loaded from file)
-user_sessions = load_sessions()
+# In-memory session storage (per-chat files, loaded lazily by get_session)
+migrate_sessions()
+user_sessions = {}
+session_tokens = {}  # chat_id -> running token estimate of the stored history
 user_profiles = load_profiles()
 user_usage = {} # Session token usage
 session_lock = asyncio.Lock()
 
+# Debounced session persistence
+SESSION_FLUSH_INTERVAL = 2.0  # seconds
+_dirty_sessions = set()
+_flush_event = asyncio.Event()
+_flusher_task = None  # session_flusher, started in post_init
+
 # Token Encoder
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or encoding unavailable offline
+    _ENC = None
+
+
+@functools.lru_cache(maxsize=8192)
+def _count_str_tokens(text):
+    if _ENC is None:
+        return len(text) // 4  # Rough fallback estimate
+    return len(_ENC.encode(text, disallowed_special=()))
+
+
 def count_tokens(text):
     if not text: return 0
-    return len(str(text)) // 4
+    if not isinstance(text, str):
+        text = str(text)
+    # Summaries and repeated prompts get re-counted often; long one-off texts would only churn the cache
+    if len(text) > 4096:
+        return _count_str_tokens.__wrapped__(text)
+    return _count_str_tokens(text)
 
 # Task management for stopping
 running_tasks = {}
 
+SUMMARY_PREFIX = "[Previous Conversation Summary]: "
+HEURISTIC_SUMMARY_MAX_TOKENS = 1000  # Above this the digest is too long; ask the LLM instead
+LLM_SUMMARY_MIN_MESSAGES = 40
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def heuristic_summary(history_slice):
+    """Cheap extractive digest of a history slice, without an LLM round-trip."""
+    lines = []
+    for m in history_slice:
+        role = m.get("role", "unknown")
+        content = str(m.get("content") or "").strip()
+        if not content:
+            continue
+
+        if role == "system":
+            # Earlier summaries are already condensed: carry them over as-is
+            lines.append(content.removeprefix(SUMMARY_PREFIX))
+        elif role == "tool":
+            status = "ERR" if content.startswith("Error") else "OK"
+            lines.append(f"[{m.get('name', 'tool')}] {status}")
+        else:
+            sentences = _SENTENCE_SPLIT.split(content)
+            digest = sentences[0]
+            if role == "assistant" and len(sentences) > 1:
+                digest += f" ... {sentences[-1]}"
+            lines.append(f"{role}: {digest[:300]}")
+
+    return "\n".join(lines)
+
+
 async def summarize_history(history_slice):
     """Summarizes a slice of conversation history."""
     try:
@@ -113,8 +251,8 @@ async def summarize_history(history_slice):
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     async with session_lock:
-        user_sessions[chat_id] = []
-        save_sessions()
+        set_session(chat_id, [])
+        mark_session_dirty(chat_id)
 
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
@@ -125,8 +263,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def clear_memory(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     async with session_lock:
-        user_sessions[chat_id] = []
-        save_sessions()
+        set_session(chat_id, [])
+        mark_session_dirty(chat_id)
     await context.bot.send_message(chat_id=chat_id, text="Memory cleared.")
 
 
@@ -143,14 +281,17 @@ async def stop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await context.bot.send_message(chat_id=chat_id, text="Nothing is running.")
 
 
+MAX_CONCURRENT_DOWNLOADS = 8
+_download_sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+
 async def save_user_file(file_obj, chat_id, original_filename=None):
     """Downloads a file and returns the local path."""
     timestamp = int(time.time())
 
     # Create user-specific dir inside downloads
     user_dir = os.path.join(DOWNLOADS_DIR, str(chat_id))
-    if not os.path.exists(user_dir):
-        os.makedirs(user_dir)
+    ensure_dir(user_dir)
 
     if original_filename:
         filename = f"{timestamp}_{original_filename}"
@@ -162,7 +303,9 @@ async def save_user_file(file_obj, chat_id, original_filename=None):
         filename = f"{timestamp}_file{ext}"
 
     filepath = os.path.join(user_dir, filename)
-    await file_obj.download_to_drive(filepath)
+    # Bound parallel downloads so a burst of uploads can't starve the bot's connection pool
+    async with _download_sem:
+        await file_obj.download_to_drive(filepath)
     return filepath
 
 
@@ -187,29 +330,40 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logging.error(f"Task failed: {e}")
 
 
+async def _cancel_running_turn(chat_id):
+    """Cancel the chat's in-flight agent turn and wait until it has unwound."""
+    task = running_tasks.get(chat_id)
+    if task and not task.done():
+        task.cancel()
+        await asyncio.wait([task])
+
+
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     status_msg = await context.bot.send_message(
         chat_id=chat_id, text="Receiving voice message..."
     )
 
+    # Summarise only once no earlier turn can still be working on this chat
+    await _cancel_running_turn(chat_id)
+    summarize_task = asyncio.create_task(maybe_summarize(chat_id, context))
     try:
         file = await update.message.voice.get_file()
         filepath = await save_user_file(file, chat_id, f"voice.ogg")
+        await summarize_task
 
         caption = update.message.caption or ""
 
         # Add file context to history immediately
         async with session_lock:
-            if chat_id not in user_sessions:
-                user_sessions[chat_id] = []
-            user_sessions[chat_id].append(
+            append_message(
+                chat_id,
                 {
                     "role": "user",
                     "content": f"[Voice file uploaded to {filepath}]. Caption: {caption}",
                 }
             )
-            save_sessions()
+            mark_session_dirty(chat_id)
 
         # Trigger Agent
         await context.bot.edit_message_text(
@@ -227,7 +381,10 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if not task.done():
                 task.cancel()
 
-        task = asyncio.create_task(process_agent_loop(chat_id, prompt, context))
+        # The renderer takes over our status message instead of sending a new one
+        task = asyncio.create_task(
+            process_agent_loop(chat_id, prompt, context, status_message_id=status_msg.message_id)
+        )
         running_tasks[chat_id] = task
         try:
             await task
@@ -235,6 +392,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
 
     except Exception as e:
+        summarize_task.cancel()
         await context.bot.send_message(
             chat_id=chat_id, text=f"Error processing voice: {str(e)}"
         )
@@ -244,23 +402,25 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
 
     # Handle multiple photos (media groups) properly by just logging them and letting agent pick up
+    await _cancel_running_turn(chat_id)
+    summarize_task = asyncio.create_task(maybe_summarize(chat_id, context))
     try:
         photo = update.message.photo[-1]
         file = await photo.get_file()
         filepath = await save_user_file(file, chat_id, f"image.jpg")
+        await summarize_task
 
         caption = update.message.caption or ""
 
         async with session_lock:
-            if chat_id not in user_sessions:
-                user_sessions[chat_id] = []
-            user_sessions[chat_id].append(
+            append_message(
+                chat_id,
                 {
                     "role": "user",
                     "content": f"[Image uploaded to {filepath}]. Caption: {caption}",
                 }
             )
-            save_sessions()
+            mark_session_dirty(chat_id)
 
         # Trigger Agent
         # If part of an album, subsequent triggers might cancel this one, but history is saved.
@@ -278,21 +438,6 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if not task.done():
                 task.cancel()
 
-        # Send status only if no recent status exists?
-        # Actually, let's just send a temp message that gets edited by agent loop
-        status_msg = await context.bot.send_message(
-            chat_id=chat_id, text="Image received. Analyzing..."
-        )
-
-        # We need to pass the status_msg ID to process_agent_loop so it can edit it.
-        # But process_agent_loop creates its own "Thinking..." message.
-        # Let's delete our temp message to avoid clutter or let agent overwrite.
-        # Better: Modify process_agent_loop to accept an existing message object to edit?
-        # For simplicity, we just delete our temp message and let agent create its own.
-        await context.bot.delete_message(
-            chat_id=chat_id, message_id=status_msg.message_id
-        )
-
         task = asyncio.create_task(process_agent_loop(chat_id, prompt, context))
         running_tasks[chat_id] = task
         try:
@@ -301,6 +446,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
 
     except Exception as e:
+        summarize_task.cancel()
         await context.bot.send_message(
             chat_id=chat_id, text=f"Error processing image: {str(e)}"
         )
@@ -308,23 +454,25 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
+    await _cancel_running_turn(chat_id)
+    summarize_task = asyncio.create_task(maybe_summarize(chat_id, context))
     try:
         doc = update.message.document
         file = await doc.get_file()
         filepath = await save_user_file(file, chat_id, doc.file_name)
+        await summarize_task
 
         caption = update.message.caption or ""
 
         async with session_lock:
-            if chat_id not in user_sessions:
-                user_sessions[chat_id] = []
-            user_sessions[chat_id].append(
+            append_message(
+                chat_id,
                 {
                     "role": "user",
                     "content": f"[File uploaded to {filepath}]. Caption: {caption}",
                 }
             )
-            save_sessions()
+            mark_session_dirty(chat_id)
 
         prompt = "Analyze this file."
         if caption:
@@ -335,13 +483,6 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if not task.done():
                 task.cancel()
 
-        status_msg = await context.bot.send_message(
-            chat_id=chat_id, text="File received. Processing..."
-        )
-        await context.bot.delete_message(
-            chat_id=chat_id, message_id=status_msg.message_id
-        )
-
         task = asyncio.create_task(process_agent_loop(chat_id, prompt, context))
         running_tasks[chat_id] = task
         try:
@@ -350,12 +491,50 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
 
     except Exception as e:
+        summarize_task.cancel()
         await context.bot.send_message(
             chat_id=chat_id, text=f"Error processing file: {str(e)}"
         )
 
 
-async def process_agent_loop(chat_id, user_input, context):
+async def _summarize_if_needed(chat_id_str, context):
+    """Condenses old history for a chat. Caller must hold session_lock."""
+    hist = get_session(chat_id_str)
+    total_tokens = session_tokens[chat_id_str]
+
+    # If history is too long ( > 15 messages OR > 4000 tokens)
+    if len(hist) > 15 or total_tokens > 4000:
+        # We want to keep the last 5 messages intact
+        if len(hist) > 6:
+            to_summarize = hist[:-6]
+            kept_history = hist[-6:]
+
+            # Try the free extractive digest first; only long runs go to the LLM
+            summary = heuristic_summary(to_summarize)
+            if (
+                len(to_summarize) > LLM_SUMMARY_MIN_MESSAGES
+                or count_tokens(summary) > HEURISTIC_SUMMARY_MAX_TOKENS
+            ):
+                # Send temporary status
+                status_msg = await context.bot.send_message(chat_id=chat_id_str, text="🔄 Optimizing memory...")
+                summary = await summarize_history(to_summarize)
+                await context.bot.delete_message(chat_id=chat_id_str, message_id=status_msg.message_id)
+
+            if summary:
+                # Replace old history with summary + recent
+                new_hist = [{"role": "system", "content": f"{SUMMARY_PREFIX}{summary}"}] + kept_history
+                set_session(chat_id_str, new_hist)
+                mark_session_dirty(chat_id_str)
+                logging.info(f"Summarized history for {chat_id_str}")
+
+
+async def maybe_summarize(chat_id, context):
+    """Runs summarisation ahead of the agent turn, e.g. while an upload downloads."""
+    async with session_lock:
+        await _summarize_if_needed(str(chat_id), context)
+
+
+async def process_agent_loop(chat_id, user_input, context, status_message_id=None):
     chat_id_str = str(chat_id)
 
     # 1. Check Usage Quota
@@ -365,40 +544,12 @@ async def process_agent_loop(chat_id, user_input, context):
         return
 
     async with session_lock:
-        if chat_id_str not in user_sessions:
-            user_sessions[chat_id_str] = []
-
         # 2. Smart Context Summarization
-        hist = user_sessions[chat_id_str]
-        # Calculate roughly
-        total_tokens = sum(count_tokens(m.get("content", "")) for m in hist)
-
-        # If history is too long ( > 15 messages OR > 4000 tokens)
-        if len(hist) > 15 or total_tokens > 4000:
-            # We want to keep the last 5 messages intact
-            if len(hist) > 6:
-                to_summarize = hist[:-6]
-                kept_history = hist[-6:]
-
-                # Send temporary status
-                status_msg = await context.bot.send_message(chat_id=chat_id, text="🔄 Optimizing memory...")
-
-                summary = await summarize_history(to_summarize)
-
-                if summary:
-                    # Replace old history with summary + recent
-                    new_hist = [{"role": "system", "content": f"[Previous Conversation Summary]: {summary}"}] + kept_history
-                    user_sessions[chat_id_str] = new_hist
-                    save_sessions()
-                    logging.info(f"Summarized history for {chat_id_str}")
-
-                await context.bot.delete_message(chat_id=chat_id, message_id=status_msg.message_id)
+        await _summarize_if_needed(chat_id_str, context)
 
-        # Shallow copy of CLEAN history
-        session_history_start = list(user_sessions[chat_id_str])
-
-    # Copy for agent to modify during this turn
-    current_history = list(session_history_start)
+        # The agent works on a per-turn copy: its tool traffic never reaches the
+        # stored history, so concurrent turns and the flusher only see finished pairs
+        current_history = list(user_sessions[chat_id_str])
 
     # REMOVED: Profile Context Injection
     # user_profile = user_profiles.get(chat_id_str, {})
@@ -407,8 +558,8 @@ async def process_agent_loop(chat_id, user_input, context):
     #    current_history.insert(0, ...)
 
     # Use TelegramRenderer for beautiful display
-    renderer = TelegramRenderer(context.bot, chat_id)
-    await renderer.start() # Sends initial "Thinking..." message
+    renderer = TelegramRenderer(context.bot, chat_id, message_id=status_message_id)
+    await renderer.start() # Sends initial "Thinking..." message unless one was handed over
 
     final_response = ""
 
@@ -435,22 +586,24 @@ async def process_agent_loop(chat_id, user_input, context):
             elif status == "tool_use":
                 tool_name = update_data.get("tool")
                 args = update_data.get("args")
-                await renderer.update("tool_use", {"tool": tool_name, "args": args})
+                renderer.push("tool_use", {"tool": tool_name, "args": args})
 
             elif status == "observation":
                 result = update_data.get("result")
-                await renderer.update("observation", result)
+                renderer.push("observation", result)
 
             elif status == "final_stream":
                 content = update_data.get("content")
-                await renderer.update("final_stream", content)
+                renderer.push("final_stream", content)
 
             elif status == "final":
                 final_response = update_data.get("content")
                 await renderer.update("final", final_response)
 
     except asyncio.CancelledError:
-        # Handle cancellation gracefully
+        # Handle cancellation gracefully; the stored history was never touched.
+        # A queued status edit must not land after the "Stopped." notice
+        await renderer.cancel_pending()
         await context.bot.send_message(chat_id=chat_id, text="Stopped.")
         return
     except Exception as e:
@@ -458,6 +611,13 @@ async def process_agent_loop(chat_id, user_input, context):
         logging.error(f"Agent loop error: {e}")
         await context.bot.send_message(chat_id=chat_id, text=final_response)
 
+    if final_response:
+        async with session_lock:
+            # Only the user/assistant pair is kept; summarisation may have swapped the list out mid-turn
+            append_message(chat_id_str, {"role": "user", "content": user_input})
+            append_message(chat_id_str, {"role": "assistant", "content": final_response})
+            mark_session_dirty(chat_id_str)
+
     # GARBAGE COLLECTION & USAGE TRACKING:
     if final_response:
         # Handle long response overflow (since renderer truncates at 4000)
@@ -478,15 +638,6 @@ async def process_agent_loop(chat_id, user_input, context):
         turn_usage = input_tokens + output_tokens + 500
         user_usage[chat_id_str] = user_usage.get(chat_id_str, 0) + turn_usage
 
-        # Update history
-        new_history = list(session_history_start)
-        new_history.append({"role": "user", "content": user_input})
-        new_history.append({"role": "assistant", "content": final_response})
-
-        async with session_lock:
-            user_sessions[chat_id_str] = new_history
-            save_sessions()
-
 
 async def scheduled_task_callback(context: ContextTypes.DEFAULT_TYPE):
     """Callback for scheduled recurring tasks."""
@@ -503,8 +654,33 @@ async def scheduled_task_callback(context: ContextTypes.DEFAULT_TYPE):
     await process_agent_loop(chat_id, prompt, context)
 
 
+async def post_init(application):
+    global _flusher_task
+    # Keep a reference: the loop only holds tasks weakly
+    _flusher_task = asyncio.create_task(session_flusher())
+
+
+async def post_shutdown(application):
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+    # Final flush so nothing marked dirty in the last interval is lost
+    await flush_sessions()
+    # Pooled HTTP connections and the Groq client shared by the tool modules
+    await close_sessions()
+
+
 if __name__ == "__main__":
-    application = ApplicationBuilder().token(config.TELEGRAM_BOT_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("clear", clear_memory))
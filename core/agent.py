@@ -5,6 +5,40 @@ import asyncio
 import os
 from core.llm import LLMService
 
+def compact_for_call(history, keep_last_tool=3):
+    """
+    Returns a copy of history where all but the last `keep_last_tool` tool results
+    before the latest assistant tool_calls message are reduced to a one-line stub.
+    Results answering that latest batch are always sent in full, since the model
+    has not seen them yet. The stored history is left untouched.
+    """
+    compacted = list(history)
+    # Everything after the latest tool_calls message is the batch being answered
+    boundary = 0
+    for i in range(len(compacted) - 1, -1, -1):
+        msg = compacted[i]
+        if msg.get("role") == "assistant" and msg.get("tool_calls"):
+            boundary = i
+            break
+
+    seen = 0
+    for i in range(boundary - 1, -1, -1):
+        msg = compacted[i]
+        if msg.get("role") != "tool":
+            continue
+        seen += 1
+        if seen <= keep_last_tool:
+            continue
+
+        content = str(msg.get("content") or "")
+        status = "ERR" if content.startswith("Error") else "OK"
+        first_line = content.split("\n", 1)[0][:80]
+        compacted[i] = {
+            **msg,
+            "content": f"[{msg.get('name', 'tool')}] {status} ({len(content)} chars) | {first_line}"
+        }
+    return compacted
+
 class Agent:
     def __init__(self, tools_registry, system_prompt=None):
         self.llm = LLMService()
@@ -38,7 +72,8 @@ class Agent:
             system_msg += "\n\n[PLAN MODE]: You are in Autonomous Plan Mode. 1. First, analyze the request and list the steps needed. 2. Execute the steps using available tools. 3. Reflect on tool outputs and adjust the plan if needed. 4. Only when the task is fully complete, provide the final answer. You determine when to stop."
 
         messages = [{"role": "system", "content": system_msg}]
-        messages.extend(history)
+        # Old tool outputs would otherwise be re-sent in full on every iteration
+        messages.extend(compact_for_call(history))
         return messages
 
     async def run(self, user_input, history=None, tool_context=None, plan_mode=True):
@@ -0,0 +1,89 @@
+"""
+Buffered appends to data/diary.txt, shared by the diary and reminders modules
+"""
+
+import asyncio
+import atexit
+import os
+from typing import Optional
+from core.fileio import ensure_dir, write_all
+
+DIARY_FILE = os.path.join("data", "diary.txt")
+
+# Appends are buffered and written in one go shortly after the last entry
+# (or as soon as the buffer gets large), instead of one open/write per entry.
+# Tool modules are loaded from file without a shared module object, so the one
+# buffer lives here and every writer and reader of the diary goes through it
+DIARY_FLUSH_DELAY = 0.25  # seconds
+DIARY_RETRY_MAX_DELAY = 30.0  # seconds between attempts while writes keep failing
+DIARY_BUFFER_LIMIT = 64 * 1024
+_diary_buf = bytearray()
+_diary_lock = asyncio.Lock()
+_diary_flush_task: Optional[asyncio.Task] = None
+_diary_fd: Optional[int] = None  # O_APPEND descriptor kept open between flushes
+
+
+def _write_diary_sync(data: bytes, sync: bool = False):
+    """Append through the long-lived descriptor; fsync only when asked to"""
+    global _diary_fd
+    # Reopen if the file was deleted or replaced under us
+    if _diary_fd is None or os.fstat(_diary_fd).st_nlink == 0:
+        if _diary_fd is not None:
+            os.close(_diary_fd)
+        ensure_dir(os.path.dirname(DIARY_FILE))
+        _diary_fd = os.open(DIARY_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    write_all(_diary_fd, data)  # One write() per flush
+    if sync:
+        os.fsync(_diary_fd)
+
+
+async def flush_diary_buffer(sync: bool = False) -> bool:
+    """Write out buffered diary entries; False if the write failed. Call before reading the file"""
+    async with _diary_lock:
+        if not _diary_buf and (not sync or _diary_fd is None):
+            return True
+        data = bytes(_diary_buf)
+        _diary_buf.clear()
+        try:
+            await asyncio.to_thread(_write_diary_sync, data, sync)
+        except Exception as e:
+            # Entries were already reported as saved: keep them ahead of newer ones for the next flush
+            _diary_buf[:0] = data
+            print(f"Error flushing diary: {e}")
+            return False
+        return True
+
+
+async def _flush_diary_later():
+    # Entries added while a write was in flight saw this task still running,
+    # so keep going until the buffer is drained; a failing disk is retried with backoff
+    delay = DIARY_FLUSH_DELAY
+    while True:
+        await asyncio.sleep(delay)
+        if not await flush_diary_buffer():
+            delay = min(delay * 2, DIARY_RETRY_MAX_DELAY)
+        elif _diary_buf:
+            delay = DIARY_FLUSH_DELAY
+        else:
+            break
+
+
+async def append_diary(data: bytes) -> None:
+    """Queue encoded entry text for the diary file"""
+    global _diary_flush_task
+    _diary_buf.extend(data)
+    if len(_diary_buf) >= DIARY_BUFFER_LIMIT:
+        await flush_diary_buffer()
+    elif _diary_flush_task is None or _diary_flush_task.done():
+        _diary_flush_task = asyncio.create_task(_flush_diary_later())
+
+
+@atexit.register
+def _flush_diary_on_exit():
+    global _diary_fd
+    if _diary_buf:
+        _write_diary_sync(bytes(_diary_buf), sync=True)
+        _diary_buf.clear()
+    if _diary_fd is not None:
+        os.close(_diary_fd)
+        _diary_fd = None
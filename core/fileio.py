@@ -0,0 +1,67 @@
+"""
+Shared JSON and file helpers for the bot and its tool modules
+"""
+
+import asyncio
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is the fallback
+    orjson = None
+
+# Files up to this size are handled inline; a thread-pool hop costs more than the I/O
+SYNC_IO_THRESHOLD = 8192
+
+_ENSURED_DIRS = set()  # Directories already created by this process
+
+
+def json_dumps(obj, indent: bool = False, newline: bool = False) -> bytes:
+    """UTF-8 encoded JSON; indent gives the 2-space layout of the files under data/"""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, option=option)
+    text = json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+    return (text + "\n" if newline else text).encode("utf-8")
+
+
+def json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def write_all(fd: int, data: bytes) -> None:
+    """os.write until the whole buffer is out; the loop only matters if the kernel takes less"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write to a temp file, fsync, then rename over the target so a crash never leaves a torn file"""
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        write_all(fd, data)
+        os.fsync(fd)  # Data must be on disk before the rename makes it visible
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
+def ensure_dir(path: str) -> None:
+    """makedirs once per path per process; later calls are a set lookup"""
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
+
+async def run_sized_io(size: int, func, *args):
+    """Run blocking file I/O inline if it touches at most SYNC_IO_THRESHOLD bytes, else in a worker thread"""
+    if size <= SYNC_IO_THRESHOLD:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
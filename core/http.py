@@ -0,0 +1,45 @@
+"""
+Shared HTTP session and Groq client for the bot and its tool modules
+"""
+
+import config
+
+# One of each per process: pooled keep-alive connections and cached DNS are shared
+# by every module, and post_shutdown closes them in one place
+_SESSION = None
+_GROQ = None
+
+
+def get_session():
+    """Lazily created pooled aiohttp session; per-module timeouts and headers go on each request"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        import aiohttp  # Imported here so modules that never make a request don't need it
+
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=75
+            )
+        )
+    return _SESSION
+
+
+def get_groq():
+    """Lazily created Groq client; its connection pool is reused between calls"""
+    global _GROQ
+    if _GROQ is None:
+        from groq import Groq
+
+        _GROQ = Groq(api_key=config.GROQ_API_KEY)
+    return _GROQ
+
+
+async def close_sessions():
+    """Close the shared clients; called once from post_shutdown"""
+    global _SESSION, _GROQ
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+    if _GROQ is not None:
+        _GROQ.close()
+        _GROQ = None
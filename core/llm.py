@@ -1,4 +1,6 @@
 import os
+import hashlib
+from collections import OrderedDict
 from openai import AsyncOpenAI
 from typing import AsyncGenerator, Union, List, Dict, Any
 import config
@@ -17,10 +19,25 @@ class LLMService:
             base_url="https://api.deepseek.com"
         )
 
+        # Embedding LRU cache: blake2b(text) -> vector
+        self._emb_cache = OrderedDict()
+        self._emb_cache_size = 4096
+
     async def get_embedding(self, text: str) -> List[float]:
         """
         Generates embedding for the given text.
         """
+        embeddings = await self.get_embeddings([text])
+        return embeddings[0] if embeddings else []
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for several texts in a single request.
+        Returns one vector per input, in order, or an empty list on failure.
+        """
+        if not texts:
+            return []
+
         try:
             # Try using OpenAI client if key exists (fallback)
             if hasattr(config, "OPENAI_API_KEY") and config.OPENAI_API_KEY:
@@ -28,11 +45,29 @@ class LLMService:
                 if not hasattr(self, "openai_client"):
                     self.openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
 
-                resp = await self.openai_client.embeddings.create(
-                    input=[text],
-                    model="text-embedding-3-small"
-                )
-                return resp.data[0].embedding
+                keys = [hashlib.blake2b(t.encode("utf-8"), digest_size=16).digest() for t in texts]
+                results = [self._emb_cache.get(k) for k in keys]
+                for k, r in zip(keys, results):
+                    if r is not None:
+                        self._emb_cache.move_to_end(k)
+
+                # Only texts not seen recently go over the network
+                missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+                if missing:
+                    resp = await self.openai_client.embeddings.create(
+                        input=missing,
+                        model="text-embedding-3-small"
+                    )
+                    fetched = dict(zip(missing, (d.embedding for d in sorted(resp.data, key=lambda d: d.index))))
+
+                    for i, (k, t) in enumerate(zip(keys, texts)):
+                        if results[i] is None:
+                            results[i] = fetched[t]
+                            self._emb_cache[k] = fetched[t]
+                    while len(self._emb_cache) > self._emb_cache_size:
+                        self._emb_cache.popitem(last=False)
+
+                return results
 
             # Use DeepSeek Embedding? (Currently DeepSeek API doesn't fully document standard embedding endpoints compatible with OpenAI lib in all regions, but let's try generic or fallback)
             # Actually, DeepSeek doesn't expose embeddings via API yet for public use in the same way.
@@ -44,7 +79,7 @@ class LLMService:
             # but I'll add a logging warning.
 
             print("Warning: No embedding provider configured (OPENAI_API_KEY missing). returning empty.")
-            return [0.0] * 1536
+            return [[0.0] * 1536 for _ in texts]
 
         except Exception as e:
             print(f"Error getting embedding: {e}")
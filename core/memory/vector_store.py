@@ -1,31 +1,178 @@
 import os
-import json
 import numpy as np
 from typing import List, Dict, Any
+from core.fileio import json_dumps, json_loads
+
+
+try:
+    from numba import njit, prange
+except ImportError:  # Optional JIT; NumPy matmul is the fallback
+    njit = None
+
+if njit:
+    @njit(parallel=True, fastmath=True, boundscheck=False, cache=True)
+    def _int8_gemv(matrix, q, out):
+        # Reads the int8 rows in place; the NumPy path has to upcast a full copy first
+        for i in prange(matrix.shape[0]):
+            acc = 0
+            for k in range(matrix.shape[1]):
+                acc += np.int32(matrix[i, k]) * np.int32(q[k])
+            out[i] = acc
+
 
 class SimpleVectorStore:
     def __init__(self, file_path="data/memory.json", embedding_dim=1536):
         self.file_path = file_path
         self.embedding_dim = embedding_dim
-        self.documents = [] # List of {'text': str, 'metadata': dict, 'embedding': list}
+        self.documents = [] # List of {'text': str, 'metadata': dict}, row-aligned with the matrix
+
+        # Text/metadata go to an append-only JSONL file; vectors to memory-mapped
+        # .npy files holding int8 rows plus one fp32 scale per row
+        base, _ = os.path.splitext(file_path)
+        self.docs_path = base + ".jsonl"
+        self.matrix_path = base + ".npy"
+        self.scales_path = base + ".scales.npy"
+
+        # Rows beyond _count are spare capacity
+        self._matrix_i8 = np.empty((0, embedding_dim), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._count = 0
+        self._scratch = np.empty(0, dtype=np.int32) # Reused output buffer for the JIT kernel
+
         self.load()
 
     def load(self):
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.documents = data
-            except Exception as e:
-                print(f"Error loading memory: {e}")
-                self.documents = []
+        if not os.path.exists(self.docs_path):
+            if os.path.exists(self.file_path):
+                self._migrate_json()
+            return
+
+        try:
+            torn = False
+            with open(self.docs_path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError
+                        self.documents.append(json_loads(line))
+                    except ValueError:
+                        torn = True # Partial trailing line from an interrupted append
+                        break
+
+            if self.documents and os.path.exists(self.matrix_path):
+                self._matrix_i8 = np.load(self.matrix_path, mmap_mode="r+")
+                self._scales = np.load(self.scales_path, mmap_mode="r+")
+                self._count = min(len(self.documents), len(self._matrix_i8), len(self._scales))
+            torn = torn or self._count < len(self.documents)
+            del self.documents[self._count:]
+
+            if torn:
+                self._write_docs()
+        except Exception as e:
+            print(f"Error loading memory: {e}")
+            self.documents = []
+            self._count = 0
+
+    def _migrate_json(self):
+        """Convert the old single-JSON store (inline embeddings or .npy sidecar) to JSONL + memmap."""
+        try:
+            with open(self.file_path, "rb") as f:
+                documents = json_loads(f.read())
+        except Exception as e:
+            print(f"Error loading memory: {e}")
+            return
+
+        if any("embedding" in d for d in documents):
+            docs = [
+                d for d in documents
+                if d.get("embedding") and len(d["embedding"]) == self.embedding_dim
+            ]
+            if len(docs) != len(documents):
+                print(f"Warning: dropped {len(documents) - len(docs)} memory entries without a usable embedding.")
+
+            self.documents = [{"text": d["text"], "metadata": d.get("metadata") or {}} for d in docs]
+            if docs:
+                matrix = np.asarray([d["embedding"] for d in docs], dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1)
+                norms[norms == 0] = 1.0
+                self._matrix_i8, self._scales = self._quantize(matrix / norms[:, None])
+        elif documents and os.path.exists(self.matrix_path):
+            self._matrix_i8 = np.load(self.matrix_path)
+            self._scales = np.load(self.scales_path)
+            self.documents = documents[:len(self._matrix_i8)]
+
+        self._count = len(self.documents)
+        self._write_all()
+
+    def _write_all(self):
+        """Rewrite the JSONL file and memmaps from the in-memory state."""
+        try:
+            os.makedirs(os.path.dirname(self.docs_path) or ".", exist_ok=True)
+            matrix, scales = self._open_memmaps(max(16, self._count))
+            matrix[:self._count] = self._matrix_i8[:self._count]
+            scales[:self._count] = self._scales[:self._count]
+            matrix.flush()
+            scales.flush()
+            self._matrix_i8, self._scales = matrix, scales
+            self._write_docs()
+        except Exception as e:
+            print(f"Error saving memory: {e}")
+
+    def _write_docs(self):
+        # Full rewrites go through a temp file; only appends touch the live file
+        tmp_path = self.docs_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(json_dumps(doc, newline=True) for doc in self.documents))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.docs_path)
+
+    def _open_memmaps(self, capacity: int, suffix: str = ""):
+        matrix = np.lib.format.open_memmap(
+            self.matrix_path + suffix, mode="w+", dtype=np.int8, shape=(capacity, self.embedding_dim)
+        )
+        scales = np.lib.format.open_memmap(
+            self.scales_path + suffix, mode="w+", dtype=np.float32, shape=(capacity,)
+        )
+        return matrix, scales
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        v = np.asarray(embedding, dtype=np.float32)
+        v /= (np.linalg.norm(v) or 1.0)
+        return v
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray):
+        """Symmetric per-row int8 quantisation: v ~= q * scale."""
+        scales = np.abs(vectors).max(axis=-1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        q = np.round(vectors / np.expand_dims(scales, -1)).astype(np.int8)
+        return q, scales
+
+    def _append_row(self, q: np.ndarray, scale: np.float32):
+        """Write one row into the memmap slot, doubling the files when full."""
+        if self._count == self._matrix_i8.shape[0]:
+            capacity = max(16, self._matrix_i8.shape[0] * 2)
+            matrix, scales = self._open_memmaps(capacity, suffix=".tmp")
+            matrix[:self._count] = self._matrix_i8[:self._count]
+            scales[:self._count] = self._scales[:self._count]
+            matrix.flush()
+            scales.flush()
+            os.replace(self.matrix_path + ".tmp", self.matrix_path)
+            os.replace(self.scales_path + ".tmp", self.scales_path)
+            self._matrix_i8, self._scales = matrix, scales
+
+        self._matrix_i8[self._count] = q
+        self._scales[self._count] = scale
+        self._count += 1
 
     def save(self):
+        """Flush pending vector writes; documents are appended as they are added."""
         try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(self.documents, f, ensure_ascii=False, indent=2)
+            if isinstance(self._matrix_i8, np.memmap):
+                self._matrix_i8.flush()
+                self._scales.flush()
         except Exception as e:
             print(f"Error saving memory: {e}")
 
@@ -34,53 +181,61 @@ class SimpleVectorStore:
              print("Warning: Attempted to add document without embedding.")
              return
 
-        doc = {
-            "text": text,
-            "embedding": embedding,
-            "metadata": metadata or {}
-        }
-        self.documents.append(doc)
-        self.save()
+        if len(embedding) != self.embedding_dim:
+            print(f"Warning: Embedding has {len(embedding)} dims, expected {self.embedding_dim}.")
+            return
 
-    def search(self, query_embedding: List[float], top_k=3, threshold=0.0) -> List[Dict]:
-        if not self.documents:
-            return []
+        if not isinstance(self._matrix_i8, np.memmap):
+            self._write_all()
 
-        if not query_embedding:
-            return []
+        q, scale = self._quantize(self._normalize(embedding))
+        doc = {"text": text, "metadata": metadata or {}}
 
-        # Filter out docs with invalid embeddings
-        valid_docs = [d for d in self.documents if d.get("embedding") and len(d["embedding"]) == len(query_embedding)]
+        try:
+            # Vector first: a crash before the JSONL line lands only leaves unused capacity
+            self._append_row(q, scale)
+            self.save()
+            with open(self.docs_path, "ab") as f:
+                f.write(json_dumps(doc, newline=True))
+            self.documents.append(doc)
+        except Exception as e:
+            print(f"Error saving memory: {e}")
+            self._count = len(self.documents)
 
-        if not valid_docs:
+    def search(self, query_embedding: List[float], top_k=3, threshold=0.0) -> List[Dict]:
+        if not self._count or not query_embedding:
             return []
 
-        embeddings = np.array([d["embedding"] for d in valid_docs])
-        query = np.array(query_embedding)
-
-        # Cosine Similarity: (A . B) / (||A|| * ||B||)
-        norm_docs = np.linalg.norm(embeddings, axis=1)
-        norm_query = np.linalg.norm(query)
-
-        # Avoid division by zero
-        norm_docs[norm_docs == 0] = 1e-10
-        if norm_query == 0:
-            norm_query = 1e-10
-
-        similarities = np.dot(embeddings, query) / (norm_docs * norm_query)
-
-        # Get top K indices
-        # argsort sorts in ascending order, so we take the last k and reverse
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-
-        results = []
-        for idx in top_indices:
-            score = similarities[idx]
-            if score >= threshold:
-                results.append({
-                    "text": valid_docs[idx]["text"],
-                    "metadata": valid_docs[idx]["metadata"],
-                    "score": float(score)
-                })
+        if len(query_embedding) != self.embedding_dim:
+            return []
 
-        return results
+        q, q_scale = self._quantize(self._normalize(query_embedding))
+
+        # int8 dot products with int32 accumulation, rescaled back to cosine similarity
+        if njit:
+            if self._scratch.shape[0] < self._count:
+                self._scratch = np.empty(self._matrix_i8.shape[0], dtype=np.int32)
+            raw = self._scratch[:self._count]
+            _int8_gemv(self._matrix_i8[:self._count], q, raw)
+        else:
+            # NumPy integer matmul has no BLAS path; float32 sgemv is much faster (exact up to 2**24)
+            raw = self._matrix_i8[:self._count].astype(np.float32) @ q.astype(np.float32)
+        similarities = raw * (self._scales[:self._count] * q_scale)
+
+        # Get top K indices without a full sort
+        if top_k < self._count:
+            top_indices = np.argpartition(-similarities, top_k)[:top_k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
+        else:
+            top_indices = np.argsort(-similarities)
+
+        top_indices = top_indices[similarities[top_indices] >= threshold]
+
+        return [
+            {
+                "text": self.documents[idx]["text"],
+                "metadata": self.documents[idx]["metadata"],
+                "score": score
+            }
+            for idx, score in zip(top_indices.tolist(), similarities[top_indices].tolist())
+        ]
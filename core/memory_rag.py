@@ -1,4 +1,5 @@
 import os
+import asyncio
 import traceback
 from core.memory.vector_store import SimpleVectorStore
 from core.llm import LLMService
@@ -9,10 +10,48 @@ class VectorMemory:
         self.store = SimpleVectorStore(file_path=persist_path)
         self.llm = LLMService() # We need this for embeddings
 
+        # Concurrent add() calls are coalesced into one embeddings request
+        self.batch_delay = 0.05
+        self._pending = [] # (text, future)
+        self._flush_handle = None
+        self._flush_task = None # Strong reference so the running flush isn't garbage-collected
+
+    def _embed_batched(self, text):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_delay, self._start_flush
+            )
+        return future
+
+    def _start_flush(self):
+        self._flush_task = asyncio.create_task(self._flush_embeddings())
+
+    async def _flush_embeddings(self):
+        batch, self._pending, self._flush_handle = self._pending, [], None
+        try:
+            embeddings = await self.llm.get_embeddings([text for text, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            # Hand the failure to every waiter instead of leaving them pending forever
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if len(embeddings) != len(batch):
+            embeddings = [[] for _ in batch]
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
     async def add(self, text, metadata=None):
         try:
             # Generate embedding
-            embedding = await self.llm.get_embedding(text)
+            embedding = await self._embed_batched(text)
             if not embedding:
                 return "Failed to generate embedding."
 
@@ -18,14 +18,18 @@ class ToolRegistry:
         """Set global context variables available to tools."""
         self.context.update(kwargs)
 
-    def register(self, name, func, description, requires_context=False):
-        """Register a new tool."""
+    def register(self, name, func, description, requires_context=False, inline=False):
+        """Register a new tool.
+
+        inline=True marks a cheap sync function that should be called directly
+        on the event loop instead of being sent to a worker thread.
+        """
         is_async = inspect.iscoroutinefunction(func)
         self.tools[name] = {
             "func": func,
             "description": description,
             "requires_context": requires_context,
-            "is_async": is_async
+            "is_async": is_async or inline # Callers skip to_thread; sync results are returned as-is
         }
 
         try:
@@ -1,20 +1,40 @@
 import time
 import asyncio
+from collections import deque
 from telegram import constants
-from telegram.error import BadRequest
+from telegram.error import BadRequest, RetryAfter
+
+# Bot-wide budget for message edits, shared by all renderers (Telegram allows ~30/s)
+EDITS_PER_SECOND = 25
+_next_edit_slot = 0.0
+
+async def _wait_for_edit_slot():
+    global _next_edit_slot
+    now = time.monotonic()
+    slot = max(now, _next_edit_slot)
+    _next_edit_slot = slot + 1.0 / EDITS_PER_SECOND
+    if slot > now:
+        await asyncio.sleep(slot - now)
 
 class TelegramRenderer:
-    def __init__(self, bot, chat_id):
+    def __init__(self, bot, chat_id, message_id=None):
         self.bot = bot
         self.chat_id = chat_id
-        self.message_id = None
-        self.buffer = []  # List of dicts: {'type': str, 'content': Any}
+        self.message_id = message_id  # An existing status message to edit, if any
+        # Display state, kept ready to render instead of rebuilt from an event log
+        self._logs = deque(maxlen=8)  # Last visible tool/result lines
+        self._stream_chunks = []  # Pieces of the current answer block, joined lazily
+        self._last_type = None
         self.last_update_time = 0
         self.update_interval = 2.0  # seconds
         self.is_finished = False
+        self._render_task = None  # Pending background edit scheduled by push()
+        self._last_text = None  # What the message currently shows
 
     async def start(self):
         """Send the initial 'Thinking...' message."""
+        if self.message_id:
+            return
         try:
             msg = await self.bot.send_message(
                 chat_id=self.chat_id,
@@ -30,39 +50,76 @@ class TelegramRenderer:
         Update the renderer state.
         status_type: "thinking", "tool_use", "observation", "final_stream", "final"
         """
+        if status_type == "final":
+            # The final render supersedes anything still queued
+            await self.cancel_pending()
+            self._apply(status_type, content)
+            self.is_finished = True
+            await self.render(force=True)
+        elif self._apply(status_type, content):
+            await self.render()
+
+    async def cancel_pending(self):
+        """Cancel the background edit scheduled by push() and wait until it has unwound."""
+        task = self._render_task
+        if task and not task.done():
+            task.cancel()
+            await asyncio.wait([task])
+
+    def push(self, status_type, content):
+        """
+        Non-blocking variant of update(): the state changes immediately and the
+        Telegram edit runs in a background task, so the caller never waits on
+        the API. Bursts of updates collapse into a single edit.
+        """
+        if status_type == "final":
+            raise ValueError("Use 'await update(\"final\", ...)' to finish rendering.")
+
+        if self._apply(status_type, content) and (self._render_task is None or self._render_task.done()):
+            self._render_task = asyncio.create_task(self._deferred_render())
+
+    async def _deferred_render(self):
+        # Wait out the rate-limit window instead of dropping the update
+        delay = self.update_interval - (time.time() - self.last_update_time)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.render(force=True)
+
+    def _apply(self, status_type, content):
+        """Applies an update to the display state. Returns True if it should be rendered."""
         if status_type == "final_stream":
-            # Append to the last final_stream block if exists
-            if not self.buffer or self.buffer[-1]['type'] != 'final_stream':
-                self.buffer.append({'type': 'final_stream', 'content': content})
-            else:
-                self.buffer[-1]['content'] += content
+            # Text after a tool call starts a new block; only the latest one is shown
+            if self._last_type != 'final_stream':
+                self._stream_chunks = []
+            self._stream_chunks.append(content)
+            self._last_type = status_type
+            return False
 
         elif status_type == "final":
-             # Replace the last stream block with the full final content if needed
-             # or just mark finished
-             if self.buffer and self.buffer[-1]['type'] == 'final_stream':
-                 self.buffer[-1]['content'] = content # Overwrite with full content
-             else:
-                 self.buffer.append({'type': 'final_stream', 'content': content})
-             self.is_finished = True
-             await self.render(force=True)
+             # Replace the last stream block with the full final content
+             self._stream_chunks = [content]
+             self._last_type = 'final_stream'
+             return True
 
         elif status_type == "tool_use":
-            self.buffer.append({'type': 'tool_use', 'content': content})
-            await self.render()
+            tool_name = content.get('tool', 'Unknown') if isinstance(content, dict) else 'Unknown'
+            self._logs.append(f"🔧 Executing: {tool_name}...")
+            self._last_type = status_type
+            return True
 
         elif status_type == "observation":
-            # Find the last tool_use and attach result?
-            # Or just append observation
-            self.buffer.append({'type': 'observation', 'content': content})
-            await self.render()
+            result = str(content).replace("Tool '", "").replace("' output:", "") # Cleanup
+            # Truncate
+            if len(result) > 50: result = result[:50] + "..."
+            self._logs.append(f"  ↳ Result: {result}")
+            self._last_type = status_type
+            return True
 
         elif status_type == "thinking":
             # Optional: Add thought log
-            pass
+            return False
 
-        else:
-            await self.render()
+        return True
 
     async def render(self, force=False):
         """Render the current state to the Telegram message."""
@@ -72,68 +129,65 @@ class TelegramRenderer:
 
         text = self._format_text()
         if not text: return
+        if text == self._last_text: return # Saves the call that would fail with "not modified"
 
         if not self.message_id:
             await self.start()
             if not self.message_id: return
 
         try:
-            await self.bot.edit_message_text(
-                chat_id=self.chat_id,
-                message_id=self.message_id,
-                text=text,
-                parse_mode=constants.ParseMode.MARKDOWN
-            )
+            await self._edit(text, parse_mode=constants.ParseMode.MARKDOWN)
             self.last_update_time = now
+            self._last_text = text
         except BadRequest as e:
             if "Message is not modified" in str(e):
                 pass
             else:
                 # If Markdown fails, retry without it or fallback
                 try:
-                    await self.bot.edit_message_text(
-                        chat_id=self.chat_id,
-                        message_id=self.message_id,
-                        text=text # Retry plain
-                    )
+                    await self._edit(text) # Retry plain
+                    self._last_text = text
                 except:
                     print(f"Failed to render message: {e}")
         except Exception as e:
             print(f"Render error: {e}")
 
+    async def _edit(self, text, parse_mode=None):
+        """edit_message_text within the shared rate budget, honouring one flood-control wait."""
+        for attempt in range(2):
+            await _wait_for_edit_slot()
+            try:
+                await self.bot.edit_message_text(
+                    chat_id=self.chat_id,
+                    message_id=self.message_id,
+                    text=text,
+                    parse_mode=parse_mode
+                )
+                return
+            except RetryAfter as e:
+                if attempt:
+                    raise
+                delay = e.retry_after
+                await asyncio.sleep(delay.total_seconds() if hasattr(delay, "total_seconds") else delay)
+
     def _format_text(self):
-        """Format the buffer into a CLI-style string."""
+        """Format the display state into a CLI-style string."""
         display_text = ""
 
         # 1. Logs (Tools & Plans)
-        logs = []
-        for item in self.buffer:
-            if item['type'] == 'tool_use':
-                tool_name = item['content'].get('tool', 'Unknown')
-                logs.append(f"🔧 Executing: {tool_name}...")
-            elif item['type'] == 'observation':
-                result = item['content'].replace("Tool '", "").replace("' output:", "") # Cleanup
-                # Truncate
-                if len(result) > 50: result = result[:50] + "..."
-                logs.append(f"  ↳ Result: {result}")
-
-        if logs:
-            # Show last 8 lines
-            visible_logs = logs[-8:]
-            log_block = "\n".join(visible_logs)
+        if self._logs:
+            log_block = "\n".join(self._logs)
             display_text += f"```\n{log_block}\n```\n"
 
         # 2. Main Content (Stream)
-        # Find the final stream
-        final_content = ""
-        for item in self.buffer:
-            if item['type'] == 'final_stream':
-                final_content = item['content']
+        if len(self._stream_chunks) > 1:
+            self._stream_chunks = ["".join(self._stream_chunks)]
+        final_content = self._stream_chunks[0] if self._stream_chunks else ""
 
         if final_content:
             display_text += final_content
         else:
-            if not logs:
+            if not self._logs:
                 display_text = "Thinking..."
 
         # Truncate to Telegram limit (4096)
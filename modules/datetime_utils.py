@@ -4,16 +4,29 @@ Unified DateTime Module
 Все функции асинхронные.
 """
 
-import asyncio
+import os
+import re
+import time
 import datetime
 import pytz
+from collections import OrderedDict
 from typing import Dict, Any, Optional
+from core.http import get_session
 
 # Constants
 IRKUTSK_TZ = pytz.timezone("Asia/Irkutsk")
 MOSCOW_TZ = pytz.timezone("Europe/Moscow")
 UTC_TZ = pytz.UTC
 
+# Short-lived cache for bursts of tool calls; DATETIME_CACHE_ENABLED=0 turns it off
+_INFO_CACHE_ENABLED = os.environ.get("DATETIME_CACHE_ENABLED", "1") != "0"
+_INFO_CACHE = (float("-inf"), {})
+
+# Weather changes slowly; repeat lookups for a city within the TTL skip the network
+_WEATHER_TTL = 300  # seconds
+_WEATHER_CACHE_MAX = 128  # cities; the oldest lookup is dropped first
+_WEATHER_CACHE = OrderedDict()  # city -> (monotonic timestamp, text), oldest first
+
 # User preferences storage
 _user_date_prefs = {
     "preferred_year": None,
@@ -37,7 +50,7 @@ async def get_current_time() -> str:
 async def get_irkutsk_time() -> Dict[str, Any]:
     """Get current time in Irkutsk timezone (UTC+8)"""
     try:
-        utc_now = datetime.datetime.now(pytz.UTC)
+        utc_now = datetime.datetime.now(UTC_TZ)
         irkutsk_now = utc_now.astimezone(IRKUTSK_TZ)
 
         return {
@@ -55,17 +68,37 @@ async def get_irkutsk_time() -> Dict[str, Any]:
 async def get_weather(city: str) -> str:
     """Fetch weather from wttr.in"""
     try:
-        import aiohttp
+        key = city.strip().lower()
+        now = time.monotonic()
+        cached = _WEATHER_CACHE.get(key)
+        if cached:
+            if now - cached[0] < _WEATHER_TTL:
+                return cached[1]
+            del _WEATHER_CACHE[key]
 
         url = f"https://wttr.in/{city}?format=3"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    text = await response.text()
-                    return text.strip()
-                else:
-                    return f"Error: Could not fetch weather for {city}. Status: {response.status}"
+        async with get_session().get(url, timeout=10) as response:
+            if response.status == 200:
+                # A weather line is tiny; never buffer more than 64 KB of whatever came back
+                body = b""
+                async for chunk in response.content.iter_chunked(16 * 1024):
+                    body += chunk
+                    if len(body) >= 64 * 1024:
+                        break
+                text = body.decode(response.get_encoding(), errors="replace").strip()
+                now = time.monotonic()
+                _WEATHER_CACHE[key] = (now, text)
+                _WEATHER_CACHE.move_to_end(key)  # Two lookups for a city may race
+                # Entries are in insertion-time order: expired ones sit at the front
+                while _WEATHER_CACHE and (
+                    len(_WEATHER_CACHE) > _WEATHER_CACHE_MAX
+                    or now - next(iter(_WEATHER_CACHE.values()))[0] >= _WEATHER_TTL
+                ):
+                    _WEATHER_CACHE.popitem(last=False)
+                return text
+            else:
+                return f"Error: Could not fetch weather for {city}. Status: {response.status}"
     except Exception as e:
         return f"Error fetching weather: {str(e)}"
 
@@ -73,41 +106,68 @@ async def get_weather(city: str) -> str:
 # ==================== DATETIME INFO FUNCTIONS ====================
 
 
+def _datetime_info() -> Dict[str, Any]:
+    """Builds the datetime info dict, reusing it for up to a second"""
+    global _INFO_CACHE
+
+    ts = time.monotonic()
+    if _INFO_CACHE_ENABLED and ts - _INFO_CACHE[0] < 1.0:
+        return dict(_INFO_CACHE[1])
+
+    # One clock read; local and Irkutsk times are both derived from it
+    utc_now = datetime.datetime.now(UTC_TZ)
+    now = utc_now.astimezone().replace(tzinfo=None)
+    irkutsk_now = utc_now.astimezone(IRKUTSK_TZ)
+
+    # One strftime per clock, split into the individual fields
+    sys_date, sys_time, weekday = now.strftime("%Y-%m-%d|%H:%M:%S|%A").split("|")
+    irk_date, irk_time = irkutsk_now.strftime("%Y-%m-%d|%H:%M:%S").split("|")
+
+    info = {
+        "system_date": sys_date,
+        "system_time": sys_time,
+        "system_datetime": f"{sys_date} {sys_time}",
+        "irkutsk_date": irk_date,
+        "irkutsk_time": irk_time,
+        "irkutsk_datetime": f"{irk_date} {irk_time}",
+        "year": now.year,
+        "month": now.month,
+        "day": now.day,
+        "weekday": weekday,
+        "is_future": now.year > 2024,
+        "timezone": "Asia/Irkutsk (UTC+8)",
+        "note": "ВСЕГДА проверяйте эту дату перед ответом на вопросы о текущих событиях!",
+    }
+
+    _INFO_CACHE = (ts, info)
+    return dict(info)
+
+
 async def get_current_datetime_info() -> Dict[str, Any]:
     """Get detailed datetime information with timezone data"""
     try:
-        now = datetime.datetime.now()
-        irkutsk_now = datetime.datetime.now(IRKUTSK_TZ)
-
-        info = {
-            "system_date": now.strftime("%Y-%m-%d"),
-            "system_time": now.strftime("%H:%M:%S"),
-            "system_datetime": now.strftime("%Y-%m-%d %H:%M:%S"),
-            "irkutsk_date": irkutsk_now.strftime("%Y-%m-%d"),
-            "irkutsk_time": irkutsk_now.strftime("%H:%M:%S"),
-            "irkutsk_datetime": irkutsk_now.strftime("%Y-%m-%d %H:%M:%S"),
-            "year": now.year,
-            "month": now.month,
-            "day": now.day,
-            "weekday": now.strftime("%A"),
-            "is_future": now.year > 2024,
-            "timezone": "Asia/Irkutsk (UTC+8)",
-            "note": "ВСЕГДА проверяйте эту дату перед ответом на вопросы о текущих событиях!",
-        }
-
-        return info
+        return _datetime_info()
     except Exception as e:
         return {"error": str(e), "note": "Не удалось получить информацию о дате"}
 
 
+_WARNING_CACHE = (None, "")  # (system_datetime, rendered warning)
+
+
 def format_date_warning() -> str:
     """Format date warning for system instructions"""
+    global _WARNING_CACHE
+
     try:
-        info = asyncio.run(get_current_datetime_info())
+        info = _datetime_info()
 
         if "error" in info:
             return "⚠️ ВНИМАНИЕ: Не удалось проверить системную дату!"
 
+        # Everything in the text derives from the timestamp: render once per second
+        if _WARNING_CACHE[0] == info["system_datetime"]:
+            return _WARNING_CACHE[1]
+
         warning = f"""
 ⚠️ **ВАЖНОЕ ПРЕДУПРЕЖДЕНИЕ О ДАТЕ:**
 
@@ -128,42 +188,48 @@ def format_date_warning() -> str:
 
 {info["note"]}
 """
+        _WARNING_CACHE = (info["system_datetime"], warning)
         return warning
     except Exception as e:
         return f"Ошибка при форматировании предупреждения: {str(e)}"
 
 
+DATE_SENSITIVE_KEYWORDS = [
+    "сегодня",
+    "сейчас",
+    "текущий",
+    "идет",
+    "live",
+    "турнир",
+    "матч",
+    "погода",
+    "расписание",
+    "новости",
+    "события",
+    "актуальн",
+    "вчера",
+    "завтра",
+    "неделя",
+    "месяц",
+    "год",
+]
+# Single alternation pattern: one pass over the query instead of one per keyword.
+# IGNORECASE spares a lowercased copy of every query.
+_DATE_KEYWORDS_RE = re.compile(
+    "|".join(map(re.escape, DATE_SENSITIVE_KEYWORDS)), re.IGNORECASE
+)
+
+
 async def check_date_before_response(user_query: str) -> Optional[str]:
     """Check if date warning is needed for user query"""
     try:
+        # Most queries have no date keyword: bail out before building the datetime info
+        if _DATE_KEYWORDS_RE.search(user_query) is None:
+            return None
+
         info = await get_current_datetime_info()
 
-        date_sensitive_keywords = [
-            "сегодня",
-            "сейчас",
-            "текущий",
-            "идет",
-            "live",
-            "турнир",
-            "матч",
-            "погода",
-            "расписание",
-            "новости",
-            "события",
-            "актуальн",
-            "вчера",
-            "завтра",
-            "неделя",
-            "месяц",
-            "год",
-        ]
-
-        query_lower = user_query.lower()
-        needs_date_check = any(
-            keyword in query_lower for keyword in date_sensitive_keywords
-        )
-
-        if needs_date_check and info.get("is_future", False):
+        if info.get("is_future", False):
             return (
                 format_date_warning() + f"\n\n📝 **ЗАПРОС ПОЛЬЗОВАТЕЛЯ:** {user_query}"
             )
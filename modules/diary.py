@@ -2,50 +2,53 @@
 Diary module - ASYNC VERSION (legacy wrapper for Telegram job_queue)
 """
 
-import asyncio
 import os
+import re
 import datetime
+import functools
 from typing import Optional
-
-DIARY_FILE = "data/diary.txt"
+import aiofiles
+# One buffered writer for both diary modules; reads flush it first
+from core.diary_buffer import DIARY_FILE, append_diary, flush_diary_buffer
 
 
 async def add_entry(text: str) -> str:
     """Add a diary entry"""
     try:
-        os.makedirs("data", exist_ok=True)
-
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         entry = f"[{timestamp}] {text}\n"
 
-        def _write():
-            with open(DIARY_FILE, "a", encoding="utf-8") as f:
-                f.write(entry)
-
-        await asyncio.to_thread(_write)
+        await append_diary(entry.encode("utf-8"))
         return "Diary entry added."
     except Exception as e:
         return f"Error writing to diary: {str(e)}"
 
 
+@functools.lru_cache(maxsize=32)
+def _date_pattern(date: str):
+    # One C-level scan for "[date..." lines instead of splitting the whole file
+    return re.compile(rf"^\[{re.escape(date)}[^\r\n]*", re.M)
+
+
 async def read_entries(date: Optional[str] = None) -> str:
     """Read diary entries"""
     try:
+        await flush_diary_buffer()
         if not os.path.exists(DIARY_FILE):
             return "Diary is empty."
 
-        def _read():
-            with open(DIARY_FILE, "r", encoding="utf-8") as f:
-                return f.read()
-
-        content = await asyncio.to_thread(_read)
-
         if date:
-            filtered = [
-                line for line in content.splitlines() if line.startswith(f"[{date}")
-            ]
+            async with aiofiles.open(DIARY_FILE, "r", encoding="utf-8") as f:
+                content = await f.read()
+            filtered = _date_pattern(date).findall(content)
             return "\n".join(filtered) if filtered else f"No entries found for {date}."
 
+        # Only the tail is shown, so only the tail is read (4 bytes per char worst case)
+        async with aiofiles.open(DIARY_FILE, "rb") as f:
+            size = await f.seek(0, os.SEEK_END)
+            await f.seek(max(0, size - 8000))
+            content = (await f.read()).decode("utf-8", errors="ignore")
+
         return (
             content[-2000:] + "\n...(showing last 2000 chars)"
             if len(content) > 2000
@@ -61,13 +64,13 @@ async def diary_alarm(context):
     today = datetime.datetime.now().strftime("%Y-%m-%d")
 
     has_entry = False
+    await flush_diary_buffer()
     if os.path.exists(DIARY_FILE):
-
-        def _check():
-            with open(DIARY_FILE, "r", encoding="utf-8") as f:
-                return today in f.read()
-
-        has_entry = await asyncio.to_thread(_check)
+        # Entries are appended in order, so today's can only be near the end
+        async with aiofiles.open(DIARY_FILE, "rb") as f:
+            size = await f.seek(0, os.SEEK_END)
+            await f.seek(max(0, size - 16384))
+            has_entry = today in (await f.read()).decode("utf-8", errors="ignore")
 
     if not has_entry:
         await context.bot.send_message(
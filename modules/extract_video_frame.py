@@ -1,22 +1,49 @@
-import subprocess
+import asyncio
 import os
 import sys
 
-def run_ffmpeg_extract(video_path, output_path, time_val):
+try:
+    import av
+except ImportError:  # Optional: decode in-process instead of spawning ffmpeg
+    av = None
+
+def pyav_extract(video_path, output_path, time_val):
+    """
+    Decodes one frame in-process: the first frame at or after time_val, else the first frame.
+    Returns (success, used_fallback).
+    """
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        for target in (time_val, 0):
+            if target:
+                # Seek lands on the keyframe before the target; decode forward from there
+                container.seek(int(target / stream.time_base), stream=stream)
+            else:
+                container.seek(0)
+            for frame in container.decode(stream):
+                if frame.time is None or frame.time >= target:
+                    frame.to_image().save(output_path)
+                    return True, target != time_val
+    return False, False
+
+async def run_ffmpeg_extract(video_path, output_path, time_val):
     """Helper to run ffmpeg command for a specific time."""
-    cmd = [
+    # Async subprocess: the event loop keeps serving other chats while ffmpeg runs
+    proc = await asyncio.create_subprocess_exec(
         "ffmpeg",
         "-ss", str(time_val),
         "-i", video_path,
         "-frames:v", "1",
         "-y",
-        output_path
-    ]
-    # Run ffmpeg, suppress output unless error
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.returncode == 0 and os.path.exists(output_path), result.stderr
+        output_path,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    # Suppress output unless error
+    _, stderr = await proc.communicate()
+    return proc.returncode == 0 and os.path.exists(output_path), stderr.decode(errors="replace")
 
-def extract_frame(video_path, output_path='frame.jpg', frame_time=2):
+async def extract_frame(video_path, output_path='frame.jpg', frame_time=2):
     """
     Extracts a frame from the video at the specified time (in seconds) using ffmpeg.
     Replaces the previous implementation that used opencv (cv2).
@@ -27,14 +54,24 @@ def extract_frame(video_path, output_path='frame.jpg', frame_time=2):
         if not os.path.exists(video_path):
             return f"Файл не найден: {video_path}"
 
+        if av is not None:
+            try:
+                # One container open covers both the target time and the 0s fallback
+                success, used_fallback = await asyncio.to_thread(pyav_extract, video_path, output_path, frame_time)
+                if success:
+                    suffix = " (fallback to 0s)" if used_fallback else ""
+                    return f"Кадр сохранен как {output_path}{suffix}"
+            except Exception:
+                pass # Fall through to ffmpeg, which handles more exotic inputs
+
         # Try specific time
-        success, error = run_ffmpeg_extract(video_path, output_path, frame_time)
+        success, error = await run_ffmpeg_extract(video_path, output_path, frame_time)
 
         if success:
             return f"Кадр сохранен как {output_path}"
 
         # Fallback to time 0
-        success, error_0 = run_ffmpeg_extract(video_path, output_path, 0)
+        success, error_0 = await run_ffmpeg_extract(video_path, output_path, 0)
 
         if success:
             return f"Кадр сохранен как {output_path} (fallback to 0s)"
@@ -53,5 +90,5 @@ if __name__ == "__main__":
         video_path = "test_video.mp4"
 
     print(f"Extracting frame from {video_path}...")
-    result = extract_frame(video_path)
+    result = asyncio.run(extract_frame(video_path))
     print(result)
@@ -1,8 +1,25 @@
 import os
 import asyncio
 import aiohttp
+import aiofiles
+from urllib.parse import urlparse
 from tavily import TavilyClient
+from telegram import InputMediaPhoto
 import config
+from core.fileio import ensure_dir
+from core.http import get_session
+
+# Shared across calls so the client is built once per API key
+_TAVILY = None  # (api_key, client)
+_TIMEOUT = aiohttp.ClientTimeout(total=10)
+_HEADERS = {"User-Agent": "Mozilla/5.0"}
+MAX_IMAGE_BYTES = 20 * 1024 * 1024  # Bigger "images" are skipped rather than buffered to disk
+
+def _get_tavily(api_key):
+    global _TAVILY
+    if _TAVILY is None or _TAVILY[0] != api_key:
+        _TAVILY = (api_key, TavilyClient(api_key=api_key))
+    return _TAVILY[1]
 
 def register_tools(registry):
     registry.register(
@@ -19,7 +36,7 @@ async def search_and_download_images(query: str, max_results: int = 3, send_to_c
             return {"success": False, "error": "TAVILY_API_KEY не найден в config.py"}
 
         def fetch_urls():
-            client = TavilyClient(api_key=api_key)
+            client = _get_tavily(api_key)
             # Включаем поиск картинок в Tavily
             response = client.search(query=query, search_depth="advanced", include_images=True)
             return response.get("images", [])[:max_results]
@@ -33,41 +50,67 @@ async def search_and_download_images(query: str, max_results: int = 3, send_to_c
             return {"success": True, "downloaded": 0, "sent_to_chat": 0, "local_paths": []}
 
         save_dir = os.path.join("downloads", "images", str(chat_id) if chat_id else "public")
-        os.makedirs(save_dir, exist_ok=True)
-
-        downloaded = []
-        async with aiohttp.ClientSession() as session:
-            for i, url in enumerate(image_urls):
-                if not isinstance(url, str) or not url.startswith("http"): continue
-                try:
-                    ext = url.split(".")[-1].split("?")[0]
-                    if len(ext) > 4 or not ext.isalnum(): ext = "jpg"
-                    safe_query = "".join(c if c.isalnum() else "_" for c in query)[:15]
-                    filepath = os.path.join(save_dir, f"{safe_query}_{i}.{ext}")
-
-                    headers = {"User-Agent": "Mozilla/5.0"}
-
-                    async with session.get(url, headers=headers, timeout=10) as img_resp:
-                        if img_resp.status == 200:
-                            with open(filepath, 'wb') as f:
-                                async for chunk in img_resp.content.iter_chunked(8192):
-                                    f.write(chunk)
-                            downloaded.append({"path": filepath})
-                except:
-                    continue
-
-        downloaded_files = downloaded
+        ensure_dir(save_dir)
+
+        safe_query = "".join(c if c.isalnum() else "_" for c in query)[:15]
+        session = get_session()
+        sem = asyncio.Semaphore(5)
+
+        async def _download_one(i, url):
+            if not isinstance(url, str) or not url.startswith("http"):
+                return None
+            ext = os.path.splitext(urlparse(url).path)[1].lstrip(".").lower()
+            if not ext or len(ext) > 4 or not ext.isalnum(): ext = "jpg"
+            filepath = os.path.join(save_dir, f"{safe_query}_{i}.{ext}")
+
+            async with sem:
+                async with session.get(url, timeout=_TIMEOUT, headers=_HEADERS) as img_resp:
+                    if img_resp.status != 200:
+                        return None
+                    if (img_resp.content_length or 0) > MAX_IMAGE_BYTES:
+                        return None
+                    total = 0
+                    async with aiofiles.open(filepath, 'wb') as f:
+                        async for chunk in img_resp.content.iter_chunked(64 * 1024):
+                            total += len(chunk)
+                            if total > MAX_IMAGE_BYTES:
+                                break
+                            await f.write(chunk)
+                    if total > MAX_IMAGE_BYTES:
+                        os.remove(filepath)
+                        return None
+            return {"path": filepath}
+
+        results = await asyncio.gather(
+            *(_download_one(i, url) for i, url in enumerate(image_urls)), return_exceptions=True
+        )
+        downloaded_files = [r for r in results if isinstance(r, dict)]
 
         sent_count = 0
         paths = []
         if send_to_chat and bot and chat_id:
-            for file_info in downloaded_files:
-                try:
-                    with open(file_info["path"], 'rb') as photo_file:
-                        await bot.send_photo(chat_id=chat_id, photo=photo_file)
-                    sent_count += 1
-                except Exception as e:
-                    pass
+            # Albums hold up to 10 photos: one request instead of a send_photo per image
+            for start in range(0, len(downloaded_files), 10):
+                group = downloaded_files[start:start + 10]
+                if len(group) > 1:
+                    try:
+                        media = []
+                        for file_info in group:
+                            with open(file_info["path"], 'rb') as photo_file:
+                                media.append(InputMediaPhoto(photo_file.read()))
+                        await bot.send_media_group(chat_id=chat_id, media=media)
+                        sent_count += len(group)
+                        continue
+                    except Exception as e:
+                        pass # One bad image fails the whole album; fall back to single sends
+
+                for file_info in group:
+                    try:
+                        with open(file_info["path"], 'rb') as photo_file:
+                            await bot.send_photo(chat_id=chat_id, photo=photo_file)
+                        sent_count += 1
+                    except Exception as e:
+                        pass
 
         for f in downloaded_files: paths.append(f["path"])
 
@@ -9,14 +9,30 @@ import base64
 from typing import Optional
 import aiohttp
 import yt_dlp
-from groq import Groq
 import config
+from core.fileio import ensure_dir, json_loads
+from core.http import get_groq, get_session
+
+
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+
+
+async def _read_capped(response, limit: int) -> bytes:
+    """Read a response body, refusing to buffer more than `limit` bytes."""
+    chunks = []
+    total = 0
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        total += len(chunk)
+        if total > limit:
+            raise ValueError(f"Response larger than {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
 
 
 async def download_video(url: str) -> str:
     """Download video using yt-dlp (async wrapper)"""
     try:
-        os.makedirs("downloads", exist_ok=True)
+        ensure_dir("downloads")
 
         ydl_opts = {
             "outtmpl": "downloads/%(title)s.%(ext)s",
@@ -42,16 +58,17 @@ async def transcribe_audio(filepath: str) -> str:
         if not os.path.exists(filepath):
             return "Error: File not found."
 
-        client = Groq(api_key=config.GROQ_API_KEY)
+        client = get_groq()
 
         def _transcribe():
+            # Файл открывается в рабочем потоке и отдаётся SDK целиком, без копии в памяти
             with open(filepath, "rb") as file:
                 result = client.audio.transcriptions.create(
-                    file=(os.path.basename(filepath), file.read()),
+                    file=(os.path.basename(filepath), file),
                     model="whisper-large-v3",
                     response_format="text",
                 )
-                return str(result) if result else ""
+            return str(result) if result else ""
 
         transcription = await asyncio.to_thread(_transcribe)
         return transcription
@@ -67,28 +84,29 @@ async def recognize_image(filepath: str) -> str:
 
         url = "https://api.ocr.space/parse/image"
 
-        async with aiohttp.ClientSession() as session:
-            with open(filepath, "rb") as f:
-                data = aiohttp.FormData()
-                data.add_field("file", f, filename=os.path.basename(filepath))
-                data.add_field("apikey", config.OCR_API_KEY)
-                data.add_field("language", "eng")
-                data.add_field("isOverlayRequired", "false")
-
-                async with session.post(url, data=data, timeout=20) as response:
-                    result = await response.json()
-
-                    if result.get("IsErroredOnProcessing"):
-                        return f"OCR Error: {result.get('ErrorMessage')}"
-
-                    parsed_results = result.get("ParsedResults", [])
-                    if not parsed_results:
-                        return "No text found."
-
-                    return (
-                        parsed_results[0].get("ParsedText", "No text found")
-                        or "No text found"
-                    )
+        # aiohttp streams a file object in chunks, so the image is never fully in memory
+        with open(filepath, "rb") as f:
+            data = aiohttp.FormData()
+            data.add_field("file", f, filename=os.path.basename(filepath))
+            data.add_field("apikey", config.OCR_API_KEY)
+            data.add_field("language", "eng")
+            data.add_field("isOverlayRequired", "false")
+
+            async with get_session().post(url, data=data, timeout=20) as response:
+                body = await _read_capped(response, MAX_RESPONSE_BYTES)
+        result = json_loads(body)
+
+        if result.get("IsErroredOnProcessing"):
+            return f"OCR Error: {result.get('ErrorMessage')}"
+
+        parsed_results = result.get("ParsedResults", [])
+        if not parsed_results:
+            return "No text found."
+
+        return (
+            parsed_results[0].get("ParsedText", "No text found")
+            or "No text found"
+        )
     except Exception as e:
         return f"Error recognizing image: {str(e)}"
 
@@ -99,12 +117,13 @@ async def recognize_image_groq(filepath: str) -> str:
         if not os.path.exists(filepath):
             return "Error: File not found."
 
-        client = Groq(api_key=config.GROQ_API_KEY)
-
-        with open(filepath, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode("utf-8")
+        client = get_groq()
 
         def _recognize():
+            # Read and encode off the event loop, in the same thread hop as the API call
+            with open(filepath, "rb") as image_file:
+                base64_image = base64.b64encode(image_file.read()).decode("ascii")
+
             return client.chat.completions.create(
                 model="meta-llama/llama-4-scout-17b-16e-instruct",
                 messages=[
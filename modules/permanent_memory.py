@@ -2,19 +2,24 @@
 Permanent memory module - ASYNC VERSION
 """
 
-import asyncio
 import os
 from typing import Optional
+from core.fileio import run_sized_io
 from core.memory_rag import memory_instance
 
 MEMORY_FILE = os.path.join("Permanent memory", "Permanent-memory")
 
+# The vector store is chosen once at startup; the fallback file only needs
+# its directory checked on first use
+_MEM_ENABLED = memory_instance.enabled
+_mem_file_ready = False
+
 
 async def update_memory(info: str) -> str:
     """Append important facts to permanent memory"""
     try:
         # Try Vector Memory first
-        if memory_instance.enabled:
+        if _MEM_ENABLED:
             # New async method call
             res = await memory_instance.add(info)
             return f"Memory updated (Vector): {res}"
@@ -22,11 +27,12 @@ async def update_memory(info: str) -> str:
         # Fallback to file (Optional, keeping for legacy if vector disabled somehow)
         await _ensure_memory_file()
 
-        def _append():
-            with open(MEMORY_FILE, "a", encoding="utf-8") as f:
-                f.write(f"\n{info}")
-
-        await asyncio.to_thread(_append)
+        # A single short append is cheaper inline than through the thread pool
+        fd = os.open(MEMORY_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, f"\n{info}".encode("utf-8"))
+        finally:
+            os.close(fd)
         return f"Memory updated (File): {info}"
     except Exception as e:
         return f"Error updating memory: {str(e)}"
@@ -36,7 +42,7 @@ async def read_memory(query: str = None) -> str:
     """Retrieve facts from memory"""
     try:
         # If query provided, use vector search
-        if query and memory_instance.enabled:
+        if query and _MEM_ENABLED:
             # New async method call
             results = await memory_instance.search(query, n_results=3)
 
@@ -54,7 +60,7 @@ async def read_memory(query: str = None) -> str:
             with open(MEMORY_FILE, "r", encoding="utf-8") as f:
                 return f.read()
 
-        content = await asyncio.to_thread(_read)
+        content = await run_sized_io(os.path.getsize(MEMORY_FILE), _read)
         return content if content else "Memory is empty."
     except Exception as e:
         return f"Error reading memory: {str(e)}"
@@ -62,16 +68,13 @@ async def read_memory(query: str = None) -> str:
 
 async def _ensure_memory_file():
     """Ensure memory file exists"""
-    directory = os.path.dirname(MEMORY_FILE)
-    if not os.path.exists(directory):
-        os.makedirs(directory, exist_ok=True)
-    if not os.path.exists(MEMORY_FILE):
-
-        def _create():
-            with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-                f.write("")
-
-        await asyncio.to_thread(_create)
+    global _mem_file_ready
+    if _mem_file_ready:
+        return
+    os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
+    # O_CREAT without O_TRUNC leaves an existing file untouched
+    os.close(os.open(MEMORY_FILE, os.O_WRONLY | os.O_CREAT, 0o644))
+    _mem_file_ready = True
 
 
 async def clear_memory() -> str:
@@ -81,11 +84,8 @@ async def clear_memory() -> str:
 
         await _ensure_memory_file()
 
-        def _write():
-            with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-                f.write("")
-
-        await asyncio.to_thread(_write)
+        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
+            f.write("")
         return "Memory cleared (File only)"
     except Exception as e:
         return f"Error clearing memory: {str(e)}"
@@ -3,37 +3,82 @@ User profile module - ASYNC VERSION
 """
 
 import asyncio
-import json
+import atexit
 import os
 from typing import Dict, Any, Optional
+from core.fileio import atomic_write_bytes, ensure_dir, json_dumps, json_loads, run_sized_io
+
 
 PROFILE_FILE = "data/profiles.json"
 
 
-async def _load_profiles() -> Dict[str, Any]:
-    """Load profiles from file"""
-    if os.path.exists(PROFILE_FILE):
-        try:
+# Profiles live in memory after the first load; writes are coalesced into
+# one background flush shortly after the last change
+_profiles_cache: Optional[Dict[str, Any]] = None
+_profiles_lock = asyncio.Lock()
+_flush_task: Optional[asyncio.Task] = None
+_dirty = False
+FLUSH_DELAY = 0.2  # seconds
+FLUSH_RETRY_MAX_DELAY = 30.0  # seconds between attempts while writes keep failing
 
-            def _read():
-                with open(PROFILE_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
 
-            return await asyncio.to_thread(_read)
-        except:
-            return {}
-    return {}
+async def _load_profiles() -> Dict[str, Any]:
+    """Return the in-memory profiles, reading the file on first use"""
+    global _profiles_cache
+    if _profiles_cache is None:
+        async with _profiles_lock:
+            if _profiles_cache is None:
+                profiles = {}
+                if os.path.exists(PROFILE_FILE):
+                    try:
+
+                        def _read():
+                            with open(PROFILE_FILE, "rb") as f:
+                                return json_loads(f.read())
+
+                        profiles = await run_sized_io(os.path.getsize(PROFILE_FILE), _read)
+                    except:
+                        profiles = {}
+                _profiles_cache = profiles
+    return _profiles_cache
+
+
+def _write_profiles(data: bytes) -> None:
+    ensure_dir("data")
+    atomic_write_bytes(PROFILE_FILE, data)
+
+
+async def _flush_later() -> None:
+    global _dirty
+    delay = FLUSH_DELAY
+    # Changes made while a write is in flight set _dirty again and get another pass
+    while _dirty:
+        await asyncio.sleep(delay)
+        # Serialise on the loop thread so the dict can't change mid-dump
+        _dirty = False
+        data = json_dumps(_profiles_cache, indent=True)
+        try:
+            await asyncio.to_thread(_write_profiles, data)
+            delay = FLUSH_DELAY
+        except Exception as e:
+            _dirty = True  # Still unsaved; retry with backoff (and at exit)
+            delay = min(delay * 2, FLUSH_RETRY_MAX_DELAY)
+            print(f"Error saving profiles: {e}")
 
 
 async def _save_profiles(profiles: Dict[str, Any]) -> None:
-    """Save profiles to file"""
-    os.makedirs("data", exist_ok=True)
+    """Schedule a flush of the in-memory profiles"""
+    global _flush_task, _dirty
+    _dirty = True
+    # A running flush keeps looping while _dirty is set
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_later())
 
-    def _write():
-        with open(PROFILE_FILE, "w", encoding="utf-8") as f:
-            json.dump(profiles, f, indent=2, ensure_ascii=False)
 
-    await asyncio.to_thread(_write)
+@atexit.register
+def _flush_on_exit() -> None:
+    if _dirty and _profiles_cache is not None:
+        _write_profiles(json_dumps(_profiles_cache, indent=True))
 
 
 async def set_profile_info(key: str, value: str, chat_id: str = None) -> str:
@@ -81,7 +126,7 @@ async def get_full_profile(chat_id: str = None) -> str:
         profiles = await _load_profiles()
 
         profile = profiles.get(chat_id, {})
-        return json.dumps(profile, indent=2, ensure_ascii=False)
+        return json_dumps(profile, indent=True).decode("utf-8")
     except Exception as e:
         return f"Error getting full profile: {str(e)}"
 
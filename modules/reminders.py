@@ -6,18 +6,24 @@ Unified Reminders Module
 
 import asyncio
 import datetime
-import json
+import mmap
 import os
+import sys
+import time
+from collections import namedtuple
 from typing import Optional, Dict, List, Any
 from zoneinfo import ZoneInfo
+from core.diary_buffer import DIARY_FILE, append_diary, flush_diary_buffer
+from core.fileio import atomic_write_bytes, json_dumps, json_loads, run_sized_io
+
 
 # Constants
 DATA_DIR = "data"
-DIARY_FILE = os.path.join(DATA_DIR, "diary.txt")
 SCHEDULE_FILE = os.path.join(DATA_DIR, "schedule_config.json")
 DEFAULT_DIARY_TIME = "20:00"
 DEFAULT_EVENING_TIME = "20:00"
 MORNING_CHECK_TIMES = ["06:00", "07:00", "08:00", "09:00"]
+DIARY_REMINDER_MINUTES = 20 * 60  # DEFAULT_DIARY_TIME as minutes past midnight
 
 IRKUTSK_TZ = ZoneInfo("Asia/Irkutsk")
 
@@ -99,6 +105,25 @@ BASE_SCHEDULE = {
     },
 }
 
+Lesson = namedtuple("Lesson", "time subject room")
+
+# Rows become tuples with interned fields: no per-row dict, and repeated
+# subjects/rooms share one string object
+for _days in BASE_SCHEDULE.values():
+    for _day, _lessons in _days.items():
+        _days[_day] = [
+            Lesson(sys.intern(l["time"]), sys.intern(l["subject"]), sys.intern(l["room"]))
+            for l in _lessons
+        ]
+del _days, _day, _lessons
+
+# Lessons with an actual subject, per (week type, day); the schedule is static
+FILTERED_SCHEDULE = {
+    (week_type, day): tuple(l for l in lessons if l.subject.strip())
+    for week_type, days in BASE_SCHEDULE.items()
+    for day, lessons in days.items()
+}
+
 
 def _ensure_data_dir():
     """Ensure data directory exists"""
@@ -143,7 +168,7 @@ async def initialize_diary() -> Dict[str, Any]:
 
 """
 
-        await asyncio.to_thread(_write_file_sync, DIARY_FILE, template)
+        _write_file_sync(DIARY_FILE, template)
 
         return {
             "status": "created",
@@ -166,16 +191,33 @@ def _read_file_sync(filepath: str) -> str:
         return f.read()
 
 
+async def _read_file(filepath: str) -> str:
+    """Read small files inline, larger ones in a worker thread"""
+    return await run_sized_io(os.path.getsize(filepath), _read_file_sync, filepath)
+
+
+async def flush_diary(sync: bool = True) -> str:
+    """Write pending diary entries to disk, optionally waiting for fsync"""
+    await flush_diary_buffer(sync=sync)
+    return "Дневник сохранён на диск" if sync else "Дневник записан"
+
+
+_diary_ready = False  # Set once the file is known to exist
+
+
 async def add_diary_entry(text: str) -> Dict[str, Any]:
     """Add entry to diary"""
+    global _diary_ready
     try:
-        await initialize_diary()
+        if not _diary_ready:
+            result = await initialize_diary()
+            _diary_ready = result.get("status") != "error"
 
         now = _get_irkutsk_now()
-        current_date = now.strftime("%Y-%m-%d")
+        current_date = f"{now.year:04d}-{now.month:02d}-{now.day:02d}"
         entry = f"\n## {current_date}\n{text}\n"
 
-        await asyncio.to_thread(_append_file_sync, DIARY_FILE, entry)
+        await append_diary(entry.encode("utf-8"))
 
         return {
             "status": "success",
@@ -186,33 +228,17 @@ async def add_diary_entry(text: str) -> Dict[str, Any]:
         return {"status": "error", "message": f"Ошибка при добавлении записи: {str(e)}"}
 
 
-def _append_file_sync(filepath: str, content: str):
-    """Synchronous file append helper"""
-    with open(filepath, "a", encoding="utf-8") as f:
-        f.write(content)
-
-
 async def read_diary(date: Optional[str] = None) -> str:
     """Read diary entries, optionally filtered by date"""
     try:
+        await flush_diary_buffer()  # Readers must see entries still sitting in the buffer
         if not os.path.exists(DIARY_FILE):
             return "Дневник пуст. Используйте initialize_diary() для создания."
 
-        content = await asyncio.to_thread(_read_file_sync, DIARY_FILE)
+        content = await asyncio.to_thread(_read_diary_window, DIARY_FILE, date)
 
         if date:
-            lines = content.split("\n")
-            filtered = []
-            capture = False
-            for line in lines:
-                if line.startswith(f"## {date}"):
-                    capture = True
-                    filtered.append(line)
-                elif line.startswith("## ") and capture:
-                    break
-                elif capture:
-                    filtered.append(line)
-            return "\n".join(filtered) if filtered else f"Записей за {date} не найдено"
+            return content if content else f"Записей за {date} не найдено"
 
         # Return last 2000 chars if too long
         if len(content) > 2000:
@@ -222,22 +248,100 @@ async def read_diary(date: Optional[str] = None) -> str:
         return f"Ошибка при чтении дневника: {str(e)}"
 
 
+def _read_diary_window(filepath: str, date: Optional[str] = None) -> str:
+    """
+    Map the diary and copy out only what is needed: the run of entries whose
+    headers start with '## <date>' (every entry of that day, or month for a
+    prefix like "2024-05"), or the tail when no date is given.
+    """
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return ""
+        with mmap.mmap(fd, 0, prot=mmap.PROT_READ) as mm:
+            if date:
+                header = f"## {date}".encode("utf-8")
+                if mm[: len(header)] == header:
+                    start = 0
+                else:
+                    start = mm.find(b"\n" + header)
+                    if start < 0:
+                        return ""
+                    start += 1  # Skip the newline before the header
+                # add_diary_entry writes a header per entry: keep going while they match
+                end = mm.find(b"\n## ", start + 1)
+                while end >= 0 and mm[end + 1 : end + 1 + len(header)] == header:
+                    end = mm.find(b"\n## ", end + 1)
+                data = mm[start : end if end >= 0 else size]
+                return data.decode("utf-8", errors="ignore")
+
+            # 2000 chars take at most 8000 bytes of UTF-8
+            data = mm[max(0, size - 8000) :]
+            return data.decode("utf-8", errors="ignore")
+    finally:
+        os.close(fd)
+
+
+# (st_ino, st_mtime_ns, size, entry_count) from the last scan. Appends keep the
+# inode and only grow the file, so then only the new bytes are counted; any
+# other change (rewrite, replace, truncate) gets a full recount
+_diary_count_cache: Optional[tuple] = None
+
+
+def _diary_stats_sync(filepath: str):
+    """Count '## ' headers and find the last one without reading the whole file"""
+    global _diary_count_cache
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        st = os.fstat(fd)
+        size = st.st_size
+        key = (st.st_ino, st.st_mtime_ns, size)
+        if size == 0:
+            _diary_count_cache = key + (0,)
+            return 0, None
+        with mmap.mmap(fd, 0, prot=mmap.PROT_READ) as mm:
+            cache = _diary_count_cache
+            if cache and cache[:3] == key:
+                count = cache[3]
+            elif cache and cache[0] == st.st_ino and 4 <= cache[2] < size:
+                # Back up 3 bytes so a header split across the old end is still seen;
+                # a header at offset 0 was already counted when the file was scanned
+                count = cache[3] + mm[cache[2] - 3 :].count(b"\n## ")
+            else:
+                count = (mm[:3] == b"## ") + mm[:].count(b"\n## ")
+            _diary_count_cache = key + (count,)
+
+            last = mm.rfind(b"\n## ")
+            if last >= 0:
+                start = last + 4
+            elif mm[:3] == b"## ":
+                start = 3
+            else:
+                return count, None
+            end = mm.find(b"\n", start)
+            line = mm[start : end if end >= 0 else size]
+            return count, line.decode("utf-8", errors="ignore").strip()
+    finally:
+        os.close(fd)
+
+
 async def get_diary_stats() -> Dict[str, Any]:
     """Get diary statistics"""
     try:
-        if not os.path.exists(DIARY_FILE):
+        await flush_diary_buffer()
+        try:
+            st = os.stat(DIARY_FILE)
+        except FileNotFoundError:
             return {"exists": False, "message": "Файл дневника не найден"}
 
-        content = await asyncio.to_thread(_read_file_sync, DIARY_FILE)
-        dates = [
-            line[3:].strip() for line in content.split("\n") if line.startswith("## ")
-        ]
+        entry_count, last_entry = await run_sized_io(st.st_size, _diary_stats_sync, DIARY_FILE)
 
         return {
             "exists": True,
-            "file_size": os.path.getsize(DIARY_FILE),
-            "entry_count": len(dates),
-            "last_entry": dates[-1] if dates else "нет записей",
+            "file_size": st.st_size,
+            "entry_count": entry_count,
+            "last_entry": last_entry or "нет записей",
         }
     except Exception as e:
         return {"exists": False, "error": str(e)}
@@ -246,38 +350,54 @@ async def get_diary_stats() -> Dict[str, Any]:
 # ==================== SCHEDULE FUNCTIONS ====================
 
 
+WEEK_TYPE_TTL = 60  # seconds; set_week_type refreshes the cache immediately
+_week_type_cache: Optional[tuple] = None  # (week_type, monotonic timestamp)
+_week_type_lock = asyncio.Lock()
+
+
 async def get_current_week_type() -> str:
     """Get current week type (числитель/знаменатель)"""
-    try:
-        _ensure_data_dir()
-        if os.path.exists(SCHEDULE_FILE):
-            content = await asyncio.to_thread(_read_file_sync, SCHEDULE_FILE)
-            data = json.loads(content)
-            return data.get("current_week_type", "числитель")
-        return "числитель"
-    except Exception:
-        return "числитель"
+    global _week_type_cache
+    if _week_type_cache and time.monotonic() - _week_type_cache[1] < WEEK_TYPE_TTL:
+        return _week_type_cache[0]
+
+    async with _week_type_lock:
+        # Another caller may have refreshed it while we waited
+        if _week_type_cache and time.monotonic() - _week_type_cache[1] < WEEK_TYPE_TTL:
+            return _week_type_cache[0]
+
+        week_type = "числитель"
+        try:
+            _ensure_data_dir()
+            if os.path.exists(SCHEDULE_FILE):
+                content = await _read_file(SCHEDULE_FILE)
+                data = json_loads(content)
+                week_type = data.get("current_week_type", "числитель")
+        except Exception:
+            pass
+        _week_type_cache = (week_type, time.monotonic())
+        return week_type
 
 
 async def set_week_type(week_type: str) -> str:
     """Set week type"""
+    global _week_type_cache
     try:
         _ensure_data_dir()
         data = {"current_week_type": week_type}
-        await asyncio.to_thread(
-            _write_file_sync,
-            SCHEDULE_FILE,
-            json.dumps(data, ensure_ascii=False, indent=2),
-        )
+        await asyncio.to_thread(atomic_write_bytes, SCHEDULE_FILE, json_dumps(data, indent=True))
+        _week_type_cache = (week_type, time.monotonic())
         return f"Установлена неделя: {week_type}"
     except Exception as e:
         return f"Ошибка: {str(e)}"
 
 
+_DAYS_RU = ("ПН", "ВТ", "СР", "ЧТ", "ПТ", "СБ", "ВС")
+
+
 def _get_day_of_week_ru(dt: datetime.datetime) -> str:
     """Get Russian day of week abbreviation"""
-    days = ["ПН", "ВТ", "СР", "ЧТ", "ПТ", "СБ", "ВС"]
-    return days[dt.weekday()]
+    return _DAYS_RU[dt.weekday()]
 
 
 async def get_today_schedule() -> Dict[str, Any]:
@@ -295,8 +415,7 @@ async def get_today_schedule() -> Dict[str, Any]:
                 "message": "Сегодня воскресенье - выходной!",
             }
 
-        schedule = BASE_SCHEDULE.get(week_type, {}).get(day, [])
-        lessons = [l for l in schedule if l.get("subject", "").strip()]
+        lessons = list(FILTERED_SCHEDULE.get((week_type, day), ()))
 
         return {
             "day": day,
@@ -324,8 +443,7 @@ async def get_tomorrow_schedule() -> Dict[str, Any]:
                 "message": "Завтра воскресенье - выходной!",
             }
 
-        schedule = BASE_SCHEDULE.get(week_type, {}).get(day, [])
-        lessons = [l for l in schedule if l.get("subject", "").strip()]
+        lessons = list(FILTERED_SCHEDULE.get((week_type, day), ()))
 
         return {
             "day": day,
@@ -344,15 +462,15 @@ def format_schedule_message(
     if not schedule_data.get("lessons"):
         return f"{title}: {schedule_data.get('message', 'Нет пар')}"
 
-    lines = [f"📚 {title} ({schedule_data['week_type']}, {schedule_data['day']}):"]
-    for i, lesson in enumerate(schedule_data["lessons"], 1):
-        subject = lesson["subject"]
-        time = lesson["time"]
-        room = lesson.get("room", "")
-        room_text = f" ({room})" if room else ""
-        lines.append(f"{i}. {time} - {subject}{room_text}")
-
-    lines.append(f"\nВсего пар: {schedule_data['count']}")
+    lessons = schedule_data["lessons"]
+    lines = [None] * (len(lessons) + 2)
+    lines[0] = f"📚 {title} ({schedule_data['week_type']}, {schedule_data['day']}):"
+    for i, lesson in enumerate(lessons, 1):
+        if isinstance(lesson, dict):  # Lessons built outside BASE_SCHEDULE may still be dicts
+            lesson = Lesson(lesson.get("time", ""), lesson.get("subject", ""), lesson.get("room", ""))
+        start = f"{i}. {lesson.time} - {lesson.subject}"
+        lines[i] = f"{start} ({lesson.room})" if lesson.room else start
+    lines[-1] = f"\nВсего пар: {schedule_data['count']}"
     return "\n".join(lines)
 
 
@@ -362,31 +480,21 @@ def format_schedule_message(
 async def check_diary_reminder_status() -> Dict[str, Any]:
     """Check diary reminder status"""
     now = _get_irkutsk_now()
-    current_hour, current_minute = now.hour, now.minute
-    reminder_hour, reminder_minute = 20, 0
-
-    if current_hour < reminder_hour or (
-        current_hour == reminder_hour and current_minute < reminder_minute
-    ):
-        time_diff = (reminder_hour * 60 + reminder_minute) - (
-            current_hour * 60 + current_minute
-        )
-        hours, minutes = time_diff // 60, time_diff % 60
-        time_str = (
-            f"через {hours} ч {minutes} мин" if hours > 0 else f"через {minutes} мин"
-        )
-    else:
-        time_diff = (
-            (24 * 60)
-            - (current_hour * 60 + current_minute)
-            + (reminder_hour * 60 + reminder_minute)
-        )
-        hours, minutes = time_diff // 60, time_diff % 60
+    now_minutes = now.hour * 60 + now.minute
+
+    # Minutes until the next 20:00; at exactly 20:00 that's a full day away
+    time_diff = (DIARY_REMINDER_MINUTES - now_minutes - 1) % (24 * 60) + 1
+    hours, minutes = divmod(time_diff, 60)
+    if now_minutes >= DIARY_REMINDER_MINUTES:
         time_str = f"завтра через {hours} ч {minutes} мин"
+    elif hours:
+        time_str = f"через {hours} ч {minutes} мин"
+    else:
+        time_str = f"через {minutes} мин"
 
     return {
         "reminder_time": "20:00",
-        "current_time": now.strftime("%H:%M"),
+        "current_time": f"{now.hour:02d}:{now.minute:02d}",
         "next_reminder_in": time_str,
         "status": "active",
     }
@@ -395,14 +503,16 @@ async def check_diary_reminder_status() -> Dict[str, Any]:
 async def get_all_reminders_summary() -> str:
     """Get summary of all reminders"""
     now = _get_irkutsk_now()
-    diary_status = await check_diary_reminder_status()
-    today_schedule = await get_today_schedule()
-    tomorrow_schedule = await get_tomorrow_schedule()
-    diary_stats = await get_diary_stats()
+    diary_status, today_schedule, tomorrow_schedule, diary_stats = await asyncio.gather(
+        check_diary_reminder_status(),
+        get_today_schedule(),
+        get_tomorrow_schedule(),
+        get_diary_stats(),
+    )
 
     lines = [
         "📋 СВОДКА ПО ВСЕМ НАПОМИНАНИЯМ:",
-        f"• Текущее время: {now.strftime('%H:%M')}",
+        f"• Текущее время: {now.hour:02d}:{now.minute:02d}",
         "",
         "📓 НАПОМИНАНИЕ ДЛЯ ДНЕВНИКА:",
         f"   • Время: {diary_status['reminder_time']}",
@@ -419,7 +529,7 @@ async def get_all_reminders_summary() -> str:
         lines.append(f"   • Сегодня пар: {len(today_schedule['lessons'])}")
         if today_schedule["lessons"]:
             first = today_schedule["lessons"][0]
-            lines.append(f"   • Первая пара: {first['time']} - {first['subject']}")
+            lines.append(f"   • Первая пара: {first.time} - {first.subject}")
     else:
         lines.append("   • Сегодня пар нет")
 
@@ -453,6 +563,11 @@ def register_tools(registry):
     registry.register(
         "read_diary", read_diary, "Read diary entries. Arguments: date (str, optional)"
     )
+    registry.register(
+        "flush_diary",
+        flush_diary,
+        "Force pending diary entries to disk. Arguments: sync (bool, optional)",
+    )
     registry.register("get_diary_stats", get_diary_stats, "Get diary statistics")
     registry.register(
         "get_today_schedule", get_today_schedule, "Get today's class schedule"
@@ -4,22 +4,66 @@ System utilities module - ASYNC VERSION
 
 import asyncio
 import os
+import shlex
+import shutil
 import subprocess
 from typing import Optional
+from core.fileio import run_sized_io
+
+# Anything containing these needs a real shell to interpret it
+_SHELL_CHARS = frozenset("|&;<>$`*?()[]{}~#!\\\n")
+
+
+def _simple_argv(command: str) -> Optional[list]:
+    """Split plain "binary arg arg" commands so they can skip /bin/sh"""
+    if _SHELL_CHARS.intersection(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    # Builtins (cd, export, ...) and VAR=value prefixes still go through the shell
+    if not argv or "=" in argv[0] or not shutil.which(argv[0]):
+        return None
+    return argv
+
+
+# The agent truncates tool output to 2000 chars, so there's no point holding more
+OUTPUT_LIMIT = 64 * 1024
+
+
+async def _read_capped(stream) -> bytes:
+    """Drain a pipe to EOF, keeping only the first OUTPUT_LIMIT bytes"""
+    buf = bytearray()
+    while chunk := await stream.read(65536):
+        if len(buf) < OUTPUT_LIMIT:
+            buf += chunk[: OUTPUT_LIMIT - len(buf)]
+    return bytes(buf)
 
 
 async def execute_command(command: str, timeout: int = 30) -> str:
     """Execute shell command"""
     try:
-        proc = await asyncio.create_subprocess_shell(
-            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
+        argv = _simple_argv(command)
+        if argv:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        else:
+            proc = await asyncio.create_subprocess_shell(
+                command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
 
         try:
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-            output = stdout.decode().strip()
+            stdout, stderr, _ = await asyncio.wait_for(
+                asyncio.gather(
+                    _read_capped(proc.stdout), _read_capped(proc.stderr), proc.wait()
+                ),
+                timeout=timeout,
+            )
+            output = stdout.decode(errors="replace").strip()
             if stderr:
-                output += "\nSTDERR:\n" + stderr.decode().strip()
+                output += "\nSTDERR:\n" + stderr.decode(errors="replace").strip()
             return output
         except asyncio.TimeoutError:
             proc.kill()
@@ -38,7 +82,7 @@ async def read_file(filepath: str) -> str:
             with open(filepath, "r", encoding="utf-8") as f:
                 return f.read()
 
-        return await asyncio.to_thread(_read)
+        return await run_sized_io(os.path.getsize(filepath), _read)
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
@@ -54,7 +98,7 @@ async def write_file(filepath: str, content: str) -> str:
             with open(filepath, "w", encoding="utf-8") as f:
                 f.write(content)
 
-        await asyncio.to_thread(_write)
+        await run_sized_io(len(content), _write)
         return "File written successfully."
     except Exception as e:
         return f"Error writing file: {str(e)}"
@@ -63,16 +107,15 @@ async def write_file(filepath: str, content: str) -> str:
 async def list_files(directory: str = ".") -> str:
     """List files in directory"""
     try:
-        if not os.path.exists(directory):
-            return f"Error: Directory '{directory}' not found."
-
-        files = os.listdir(directory)
-        return str(files)
+        with os.scandir(directory) as it:
+            return ", ".join(entry.name for entry in it)
+    except FileNotFoundError:
+        return f"Error: Directory '{directory}' not found."
     except Exception as e:
         return f"Error listing files: {str(e)}"
 
 
-async def file_exists(filepath: str) -> bool:
+def file_exists(filepath: str) -> bool:
     """Check if file exists"""
     return os.path.exists(filepath)
 
@@ -98,5 +141,8 @@ def register_tools(registry):
         "List files in directory. Arguments: directory (str, optional)",
     )
     registry.register(
-        "file_exists", file_exists, "Check if file exists. Arguments: filepath (str)"
+        "file_exists",
+        file_exists,
+        "Check if file exists. Arguments: filepath (str)",
+        inline=True,
     )
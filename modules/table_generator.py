@@ -4,8 +4,36 @@
 """
 
 from typing import List, Dict, Any, Optional, Union
+from collections import namedtuple
+from functools import lru_cache
+from itertools import repeat
+import operator
 import textwrap
 from datetime import datetime
+from html import escape as _he
+
+# С этого числа строк ширины колонок считаются по столбцам целиком
+_BULK_ROWS = 256
+
+# Экранирование '|' для Markdown
+_MD_ESC = str.maketrans({'|': '\\|'})
+
+# Повторяющиеся куски HTML-таблицы
+_TH_OPEN = '<th style="border: 1px solid #ddd; padding: 8px; text-align: left; background-color: #f2f2f2;">'
+_TH_CLOSE = '</th>'
+_TD_OPEN = '<td style="border: 1px solid #ddd; padding: 8px;">'
+_TD_CLOSE = '</td>'
+
+# Символы рамки для каждого стиля: углы, линии, T-образные стыки и перекрестие.
+# t_down/t_up - стыки колонок на верхней/нижней границе, t_right/t_left - на левом/правом крае
+_BorderChars = namedtuple(
+    '_BorderChars',
+    'top_left top_right bottom_left bottom_right vertical horizontal cross t_down t_up t_right t_left'
+)
+_STYLES = {
+    'border': _BorderChars('┌', '┐', '└', '┘', '│', '─', '┼', '┬', '┴', '├', '┤'),
+    'simple': _BorderChars('┌', '┐', '└', '┘', '│', '─', '┼', '┬', '┴', '├', '┤'),
+}
 
 class TableGenerator:
     """Генератор красивых таблиц"""
@@ -15,6 +43,7 @@ class TableGenerator:
         self.headers = []
         self.rows = []
         self.column_widths = []
+        self._header_cache = None  # (headers, заголовок Markdown, <thead> HTML)
         self.styles = {
             'border': '─│┌┐└┘├┤┬┴┼',
             'header_separator': '═',
@@ -24,183 +53,210 @@ class TableGenerator:
         }
         self.style = 'border'
 
+    @classmethod
+    def from_data(cls, headers: List[str], rows: List[List[Any]], title: str = "") -> "TableGenerator":
+        """Создать таблицу сразу с заголовками и строками (ширины считаются за один проход)"""
+        table = cls(title)
+        table.set_headers(headers)
+        table.add_rows(list(rows))
+        return table
+
     def set_headers(self, headers: List[str]):
         """Установить заголовки таблицы"""
         self.headers = headers
+        self._header_cache = None
         self._calculate_column_widths()
 
+    def _header_parts(self):
+        """Заголовок Markdown и <thead> HTML, собранные один раз на набор заголовков"""
+        if self._header_cache is None or self._header_cache[0] is not self.headers:
+            headers = self.headers
+            md = '| ' + ' | '.join(headers) + ' |\n|' + '|'.join(['---'] * len(headers)) + '|'
+            thead = '\n'.join(
+                ['<thead>', '<tr>'] + [_TH_OPEN + _he(str(h)) + _TH_CLOSE for h in headers] + ['</tr>', '</thead>']
+            )
+            self._header_cache = (headers, md, thead)
+        return self._header_cache
+
     def add_row(self, row: List[Any]):
         """Добавить строку данных"""
         self.rows.append(row)
-        self._calculate_column_widths()
+        self._widen_for_row(row)
 
     def add_rows(self, rows: List[List[Any]]):
         """Добавить несколько строк"""
         self.rows.extend(rows)
-        self._calculate_column_widths()
+        if len(rows) > _BULK_ROWS and self._widen_for_columns(rows):
+            return
+        for row in rows:
+            self._widen_for_row(row)
+
+    def _widen_for_columns(self, rows: List[List[Any]]) -> bool:
+        """
+        Пакетный вариант для больших вставок: каждый столбец обходится через
+        map(str)/map(len) целиком, без Python-цикла по ячейкам. Работает только
+        для прямоугольных данных; иначе возвращает False.
+        """
+        num_cols = len(self.column_widths) or len(rows[0])
+        if any(len(row) != num_cols for row in rows):
+            return False
+        if not self.column_widths:
+            self.column_widths = [3] * num_cols
+
+        widths = self.column_widths
+        for i, column in enumerate(zip(*rows)):
+            cells = list(map(str, column))
+            if any(map(operator.contains, cells, repeat('\n'))):
+                # Многострочные ячейки: длина самой длинной строки
+                longest = max(max(map(len, c.split('\n'))) for c in cells)
+            else:
+                longest = max(map(len, cells))
+            if longest > widths[i]:
+                widths[i] = longest
+        return True
+
+    def _widen_for_row(self, row: List[Any]):
+        """Расширить колонки под одну новую строку (без пересчёта всей таблицы)"""
+        if not self.column_widths:
+            # Минимальная ширина 3 символа
+            self.column_widths = [3] * len(row)
+
+        widths = self.column_widths
+        for i, cell in enumerate(row):
+            # Учитываем переносы строк
+            max_line_len = max(map(len, self._tokenize(cell)))
+            if max_line_len > widths[i]:
+                widths[i] = max_line_len
 
     def _calculate_column_widths(self):
-        """Рассчитать ширину колонок"""
-        all_data = []
+        """Рассчитать ширину колонок заново по всем данным"""
+        self.column_widths = []
         if self.headers:
-            all_data.append(self.headers)
-        all_data.extend(self.rows)
-
-        if not all_data:
-            return
-
-        num_cols = len(all_data[0])
-        self.column_widths = [0] * num_cols
-
-        for row in all_data:
-            for i, cell in enumerate(row):
-                cell_str = str(cell)
-                # Учитываем переносы строк
-                lines = cell_str.split('\n')
-                max_line_len = max(len(line) for line in lines) if lines else 0
-                self.column_widths[i] = max(self.column_widths[i], max_line_len)
-
-        # Минимальная ширина 3 символа
-        self.column_widths = [max(w, 3) for w in self.column_widths]
-
-    def _format_cell(self, cell: Any, width: int) -> str:
-        """Форматировать ячейку"""
-        cell_str = str(cell)
-        lines = cell_str.split('\n')
-        formatted_lines = []
-
-        for line in lines:
-            # Обрезать или дополнить пробелами
-            if len(line) > width:
-                line = line[:width-3] + '...'
-            formatted_lines.append(line.ljust(width))
-
-        return '\n'.join(formatted_lines)
+            self._widen_for_row(self.headers)
+        for row in self.rows:
+            self._widen_for_row(row)
+
+    @staticmethod
+    def _tokenize(cell: Any) -> List[str]:
+        """Разбить ячейку на строки (один раз на ячейку)"""
+        return str(cell).split('\n')
+
+    def _format_cell_lines(self, lines: List[str], pad: str) -> List[str]:
+        """Форматировать уже разбитую на строки ячейку; pad - пробелы на всю ширину колонки"""
+        width = len(pad)
+        # Дополнить пробелами или обрезать; длина каждой строки считается один раз
+        return [
+            line + pad[n:] if (n := len(line)) <= width else line[:width-3] + '...'
+            for line in lines
+        ]
 
     def generate_terminal_table(self) -> str:
         """Сгенерировать таблицу для терминала"""
         if not self.headers and not self.rows:
             return "Пустая таблица"
 
-        # Определить символы границ
-        if self.style == 'simple':
-            chars = self.styles['simple']
-            top_left, top_right, bottom_left, bottom_right = chars[0], chars[2], chars[3], chars[5]
-            vertical, horizontal = chars[1], chars[1]
-            cross = chars[8]
-            t_down, t_up, t_right, t_left = chars[6], chars[7], chars[4], chars[7]
-        else:
-            chars = self.styles['border']
-            top_left, top_right, bottom_left, bottom_right = chars[0], chars[1], chars[2], chars[3]
-            vertical, horizontal = chars[4], chars[0]
-            cross = chars[8]
-            t_down, t_up, t_right, t_left = chars[6], chars[7], chars[5], chars[7]
+        c = _STYLES.get(self.style, _STYLES['border'])
+
+        # Вся таблица пишется кусками в один список и склеивается один раз
+        out = []
+        write = out.append
+        line_start = c.vertical + ' '
+        cell_separator = ' ' + c.vertical + ' '
+        line_end = ' ' + c.vertical + '\n'
+        pads = [' ' * w for w in self.column_widths]
+        fmt, tokenize = self._format_cell_lines, self._tokenize
+
+        # Границы и разделители строятся один раз: по отрезку на колонку, стыки между ними
+        segments = [c.horizontal * (w + 2) for w in self.column_widths]
+        top_border = c.top_left + c.t_down.join(segments) + c.top_right + '\n'
+        row_separator = c.t_right + c.cross.join(segments) + c.t_left + '\n'
+        bottom_border = c.bottom_left + c.t_up.join(segments) + c.bottom_right
+
+        if self.title:
+            write(f"╔{'═' * (len(self.title) + 4)}╗\n║  {self.title}  ║\n╚{'═' * (len(self.title) + 4)}╝\n\n")
 
         # Верхняя граница
-        top_border = top_left + horizontal * (sum(self.column_widths) + len(self.column_widths) * 3 - 1) + top_right
+        write(top_border)
 
         # Заголовки
-        header_lines = []
         if self.headers:
-            header_cells = []
-            for i, header in enumerate(self.headers):
-                header_cells.append(self._format_cell(header, self.column_widths[i]))
+            header_cells = [fmt(tokenize(header), pad) for header, pad in zip(self.headers, pads)]
 
             # Определить максимальное количество строк в заголовках
-            max_header_lines = max(len(cell.split('\n')) for cell in header_cells)
+            max_header_lines = max(len(cell_lines) for cell_lines in header_cells)
 
             for line_num in range(max_header_lines):
                 line_parts = []
-                for cell in header_cells:
-                    cell_lines = cell.split('\n')
-                    line_parts.append(cell_lines[line_num] if line_num < len(cell_lines) else ' ' * self.column_widths[i])
-                header_lines.append(vertical + ' ' + ' ' + vertical + ' '.join(line_parts) + ' ' + vertical)
+                for i, cell_lines in enumerate(header_cells):
+                    line_parts.append(cell_lines[line_num] if line_num < len(cell_lines) else pads[i])
+                write(line_start)
+                write(cell_separator.join(line_parts))
+                write(line_end)
 
             # Разделитель заголовков
-            if self.style == 'simple':
-                header_separator = t_right + horizontal * (sum(self.column_widths) + len(self.column_widths) * 3 - 1) + t_left
-            else:
-                header_separator = t_down + horizontal * (sum(self.column_widths) + len(self.column_widths) * 3 - 1) + t_up
-        else:
-            header_lines = []
-            header_separator = ""
+            write(row_separator)
 
         # Строки данных
-        row_lines = []
         for row_idx, row in enumerate(self.rows):
-            row_cells = []
-            for i, cell in enumerate(row):
-                row_cells.append(self._format_cell(cell, self.column_widths[i]))
+            strs = list(map(str, row))
+            if not any(map(operator.contains, strs, repeat('\n'))):
+                # Частый случай: все ячейки однострочные, строка таблицы пишется сразу
+                write(line_start)
+                write(cell_separator.join([
+                    s + pad[n:] if (n := len(s)) <= len(pad) else s[:len(pad)-3] + '...'
+                    for s, pad in zip(strs, pads)
+                ]))
+                write(line_end)
+                if row_idx < len(self.rows) - 1:
+                    write(row_separator)
+                continue
+
+            row_cells = [fmt(s.split('\n'), pad) for s, pad in zip(strs, pads)]
 
             # Определить максимальное количество строк в строке
-            max_row_lines = max(len(cell.split('\n')) for cell in row_cells)
+            max_row_lines = max(len(cell_lines) for cell_lines in row_cells)
 
             for line_num in range(max_row_lines):
                 line_parts = []
-                for cell in row_cells:
-                    cell_lines = cell.split('\n')
-                    line_parts.append(cell_lines[line_num] if line_num < len(cell_lines) else ' ' * self.column_widths[i])
-                row_lines.append(vertical + ' ' + ' ' + vertical + ' '.join(line_parts) + ' ' + vertical)
+                for i, cell_lines in enumerate(row_cells):
+                    line_parts.append(cell_lines[line_num] if line_num < len(cell_lines) else pads[i])
+                write(line_start)
+                write(cell_separator.join(line_parts))
+                write(line_end)
 
             # Разделитель строк (кроме последней)
             if row_idx < len(self.rows) - 1:
-                if self.style == 'simple':
-                    row_separator = t_right + horizontal * (sum(self.column_widths) + len(self.column_widths) * 3 - 1) + t_left
-                else:
-                    row_separator = cross + horizontal * (sum(self.column_widths) + len(self.column_widths) * 3 - 1) + cross
-                row_lines.append(row_separator)
+                write(row_separator)
 
         # Нижняя граница
-        bottom_border = bottom_left + horizontal * (sum(self.column_widths) + len(self.column_widths) * 3 - 1) + bottom_right
+        write(bottom_border)
 
-        # Сборка таблицы
-        table_parts = []
-        if self.title:
-            table_parts.append(f"╔{'═' * (len(self.title) + 4)}╗")
-            table_parts.append(f"║  {self.title}  ║")
-            table_parts.append(f"╚{'═' * (len(self.title) + 4)}╝")
-            table_parts.append("")
-
-        table_parts.append(top_border)
-        if header_lines:
-            table_parts.extend(header_lines)
-            table_parts.append(header_separator)
-        table_parts.extend(row_lines)
-        table_parts.append(bottom_border)
-
-        return '\n'.join(table_parts)
+        return ''.join(out)
 
     def generate_markdown_table(self) -> str:
         """Сгенерировать таблицу в формате Markdown"""
         if not self.headers:
             return "Заголовки не установлены"
 
-        # Заголовки
-        header_line = '| ' + ' | '.join(self.headers) + ' |'
-        separator_line = '|' + '|'.join(['---' for _ in self.headers]) + '|'
-
-        # Строки данных
-        rows_lines = []
-        for row in self.rows:
-            row_cells = []
-            for i, cell in enumerate(row):
-                cell_str = str(cell)
-                # Экранировать символы Markdown
-                cell_str = cell_str.replace('|', '\\|')
-                row_cells.append(cell_str)
-            rows_lines.append('| ' + ' | '.join(row_cells) + ' |')
-
-        # Сборка таблицы
-        table_parts = []
+        out = []
+        write = out.append
         if self.title:
-            table_parts.append(f"## {self.title}")
-            table_parts.append("")
+            write(f"## {self.title}\n\n")
 
-        table_parts.append(header_line)
-        table_parts.append(separator_line)
-        table_parts.extend(rows_lines)
+        # Заголовки (строятся один раз на набор заголовков)
+        write(self._header_parts()[1])
 
-        return '\n'.join(table_parts)
+        # Строки данных
+        rows = [list(map(str, row)) for row in self.rows]
+        # Экранировать символы Markdown; обычно '|' нет нигде, и проверка по ячейкам не нужна
+        if any('|' in c for cells in rows for c in cells):
+            rows = [[c.translate(_MD_ESC) if '|' in c else c for c in cells] for cells in rows]
+        for cells in rows:
+            write('\n| ')
+            write(' | '.join(cells))
+            write(' |')
+
+        return ''.join(out)
 
     def generate_html_table(self, css_class: str = "") -> str:
         """Сгенерировать HTML таблицу"""
@@ -208,32 +264,21 @@ class TableGenerator:
             return "<p>Заголовки не установлены</p>"
 
         html_parts = []
+        ap, ext = html_parts.append, html_parts.extend
 
-        # Начало таблицы
+        # Начало таблицы и заголовки
         if css_class:
-            html_parts.append(f'<table class="{css_class}">')
+            table_open = f'<table class="{css_class}">'
         else:
-            html_parts.append('<table style="border-collapse: collapse; width: 100%;">')
-
-        # Заголовки
-        html_parts.append('<thead>')
-        html_parts.append('<tr>')
-        for header in self.headers:
-            html_parts.append(f'<th style="border: 1px solid #ddd; padding: 8px; text-align: left; background-color: #f2f2f2;">{header}</th>')
-        html_parts.append('</tr>')
-        html_parts.append('</thead>')
+            table_open = '<table style="border-collapse: collapse; width: 100%;">'
+        ext((table_open, self._header_parts()[2], '<tbody>'))
 
         # Тело таблицы
-        html_parts.append('<tbody>')
         for row in self.rows:
-            html_parts.append('<tr>')
-            for cell in row:
-                cell_str = str(cell)
-                html_parts.append(f'<td style="border: 1px solid #ddd; padding: 8px;">{cell_str}</td>')
-            html_parts.append('</tr>')
-        html_parts.append('</tbody>')
-
-        html_parts.append('</table>')
+            ap('<tr>')
+            ext([_TD_OPEN + _he(str(cell)) + _TD_CLOSE for cell in row])
+            ap('</tr>')
+        ext(('</tbody>', '</table>'))
 
         return '\n'.join(html_parts)
 
@@ -246,8 +291,11 @@ class TableGenerator:
         else:
             content = self.generate_terminal_table()
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Строка уже целиком в памяти: кодируем один раз и пишем без буфера
+        data = memoryview(content.encode('utf-8'))
+        with open(filename, 'wb', buffering=0) as f:
+            while data:
+                data = data[f.write(data):]
 
         return f"Таблица сохранена в {filename}"
 
@@ -255,20 +303,15 @@ class TableGenerator:
 # Функции для быстрого создания таблиц
 def create_simple_table(headers: List[str], rows: List[List[Any]], title: str = "") -> str:
     """Быстро создать простую таблицу"""
-    table = TableGenerator(title)
-    table.set_headers(headers)
-    table.add_rows(rows)
-    return table.generate_terminal_table()
+    return TableGenerator.from_data(headers, rows, title).generate_terminal_table()
 
 
 def create_markdown_table(headers: List[str], rows: List[List[Any]], title: str = "") -> str:
     """Быстро создать Markdown таблицу"""
-    table = TableGenerator(title)
-    table.set_headers(headers)
-    table.add_rows(rows)
-    return table.generate_markdown_table()
+    return TableGenerator.from_data(headers, rows, title).generate_markdown_table()
 
 
+@lru_cache(maxsize=1)  # Данные статичны, таблица строится один раз
 def create_ai_models_table() -> str:
     """Создать таблицу с топовыми ИИ моделями"""
     headers = ["Ранг", "Модель", "Разработчик", "GPQA Diamond", "AIME 2025", "SWE Bench", "Цена (1M токенов)"]
@@ -286,13 +329,10 @@ def create_ai_models_table() -> str:
         [10, "OpenAI o3", "OpenAI", "N/A", "98.4%", "N/A", "$10/$30"]
     ]
 
-    table = TableGenerator("🏆 ТОП-10 ИИ МОДЕЛЕЙ 2025")
-    table.set_headers(headers)
-    table.add_rows(rows)
-
-    return table.generate_terminal_table()
+    return TableGenerator.from_data(headers, rows, "🏆 ТОП-10 ИИ МОДЕЛЕЙ 2025").generate_terminal_table()
 
 
+@lru_cache(maxsize=1)
 def create_open_models_table() -> str:
     """Создать таблицу с открытыми моделями"""
     headers = ["Размер", "Модель", "Разработчик", "MMLU", "GSM8K", "HumanEval", "Лицензия"]
@@ -307,11 +347,7 @@ def create_open_models_table() -> str:
         ["111B", "Qwen1.5-110B", "Alibaba", "87.2%", "95.1%", "80.2%", "Apache 2.0"]
     ]
 
-    table = TableGenerator("📊 ТОП ОТКРЫТЫХ ИИ МОДЕЛЕЙ")
-    table.set_headers(headers)
-    table.add_rows(rows)
-
-    return table.generate_terminal_table()
+    return TableGenerator.from_data(headers, rows, "📊 ТОП ОТКРЫТЫХ ИИ МОДЕЛЕЙ").generate_terminal_table()
 
 
 if __name__ == "__main__":
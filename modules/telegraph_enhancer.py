@@ -3,11 +3,135 @@
 Модуль для создания улучшенных статей на Telegra.ph с картинками
 """
 
-import base64
+import mimetypes
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from pathlib import Path
 
+# Статичные части статьи о Cobrazera (между ними вставляются изображения)
+_COBRAZERA_HEAD = (
+    {
+        'type': 'header',
+        'content': 'Анарбилег "Cobrazera" Ууганбаяр: Будущее монгольского CS2',
+        'level': 1
+    },
+    {
+        'type': 'text',
+        'content': 'Молодой монгольский киберспортсмен, который ворвался в профессиональную сцену Counter-Strike 2 и уже показывает впечатляющие результаты в составе команды The MongolZ.'
+    },
+)
+
+_COBRAZERA_MID = (
+    # Основная информация
+    {
+        'type': 'header',
+        'content': '📊 Основная информация',
+        'level': 2
+    },
+    {
+        'type': 'list',
+        'content': [
+            'Полное имя: Анарбилег Ууганбаяр',
+            'Никнейм: Cobrazera',
+            'Дата рождения: 3 августа 2005 года',
+            'Национальность: Монголия',
+            'Текущая команда: The MongolZ',
+            'Позиция: Rifler',
+            'Игра: Counter-Strike 2'
+        ]
+    },
+
+    # Карьерный путь
+    {
+        'type': 'header',
+        'content': '🚀 Карьерный путь',
+        'level': 2
+    },
+    {
+        'type': 'text',
+        'content': 'Cobrazera начал свою профессиональную карьеру в 2024 году, играя за команду The Huns. В декабре 2025 года состоялся его переход в The MongolZ — ведущую монгольскую киберспортивную организацию, что стало важным этапом в его карьере.'
+    },
+)
+
+_COBRAZERA_TAIL = (
+    # Достижения
+    {
+        'type': 'header',
+        'content': '🏆 Достижения и статистика',
+        'level': 2
+    },
+    {
+        'type': 'text',
+        'content': 'По данным Esports Earnings, общий заработок Cobrazera составляет $15,700. Он участвовал в 6 турнирах и занимает 81 место в рейтинге монгольских игроков.'
+    },
+    {
+        'type': 'header',
+        'content': 'Ключевые турниры',
+        'level': 3
+    },
+    {
+        'type': 'list',
+        'content': [
+            'MESA Pro Series Spring 2025 — 1 место ($1,100)',
+            'ESL Challenger League Season 49: Asia — 3 место ($1,000)',
+            'IESF World Championship 2024 — 5-8 место ($2,500)',
+            'Asian Champions League 2025 — 5-6 место ($2,400)',
+            'BLAST Open Spring 2025 — 13-16 место ($1,000)'
+        ]
+    },
+
+    # Игровой стиль
+    {
+        'type': 'header',
+        'content': '🎯 Игровой стиль',
+        'level': 2
+    },
+    {
+        'type': 'text',
+        'content': 'Как rifler, Cobrazera специализируется на использовании винтовок (AK-47, M4A4). Эта позиция требует отличной точности, позиционирования и принятия быстрых решений. В возрасте 19 лет он показывает быструю адаптацию к новой команде и стабильные выступления на турнирах.'
+    },
+
+    # Значение для монгольской сцены
+    {
+        'type': 'header',
+        'content': '🇲🇳 Значение для монгольской сцены',
+        'level': 2
+    },
+    {
+        'type': 'text',
+        'content': 'Cobrazera является частью нового поколения монгольских киберспортсменов, которые поднимают уровень региона на международной арене. The MongolZ уже доказали свою конкурентоспособность на азиатской сцене, и такие игроки как Cobrazera укрепляют позиции команды.'
+    },
+
+    # Перспективы
+    {
+        'type': 'header',
+        'content': '✨ Перспективы',
+        'level': 2
+    },
+    {
+        'type': 'text',
+        'content': 'С учетом его возраста и текущего прогресса, Cobrazera имеет все шансы стать одним из ключевых игроков не только монгольской, но и азиатской сцены CS2 в ближайшие годы. Его карьера только начинается, и мы можем ожидать от него более значительных достижений на мировой арене.'
+    },
+
+    # Источники
+    {
+        'type': 'header',
+        'content': '📚 Источники',
+        'level': 2
+    },
+    {
+        'type': 'list',
+        'content': [
+            'Liquipedia Counter-Strike Wiki',
+            'HLTV.org',
+            'Esports Earnings',
+            'Prosettings.net'
+        ]
+    },
+)
+
+
 class TelegraphEnhancer:
     """Класс для создания статей с картинками для Telegra.ph"""
 
@@ -19,6 +143,8 @@ class TelegraphEnhancer:
             telegraph_publisher: Экземпляр TelegraphPublisher
         """
         self.publisher = telegraph_publisher
+        # Одна сессия на все загрузки: соединение с telegra.ph переиспользуется
+        self._session = requests.Session()
 
     def upload_image(self, image_path: str) -> str:
         """
@@ -31,17 +157,12 @@ class TelegraphEnhancer:
             URL загруженного изображения
         """
         try:
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-
-            # Кодируем в base64
-            encoded_image = base64.b64encode(image_data).decode('utf-8')
-
-            # Загружаем на Telegra.ph
+            # Загружаем на Telegra.ph, отдавая файл напрямую без чтения в память
             url = "https://telegra.ph/upload"
-            files = {'file': ('image.jpg', image_data, 'image/jpeg')}
-
-            response = requests.post(url, files=files)
+            mime_type = mimetypes.guess_type(image_path)[0] or 'image/jpeg'
+            with open(image_path, 'rb') as f:
+                files = {'file': (Path(image_path).name, f, mime_type)}
+                response = self._session.post(url, files=files)
 
             if response.status_code == 200:
                 result = response.json()
@@ -75,36 +196,44 @@ class TelegraphEnhancer:
         Returns:
             Результат создания страницы
         """
+        # Весь HTML собирается кусками в один список и склеивается один раз
         html_content = []
+        ap = html_content.append
 
         for part in content_parts:
             if part['type'] == 'text':
                 # Оборачиваем текст в параграфы
-                paragraphs = part['content'].split('\n\n')
-                for p in paragraphs:
-                    if p.strip():
-                        html_content.append(f"<p>{p.strip()}</p>")
+                for p in part['content'].split('\n\n'):
+                    p = p.strip()
+                    if p:
+                        ap('<p>')
+                        ap(p)
+                        ap('</p>')
 
             elif part['type'] == 'image':
                 image_url = part['content']
                 if image_url:
-                    html_content.append(f'<img src="{image_url}" alt="{title}"/>')
+                    ap(f'<img src="{image_url}" alt="{title}"/>')
                     if 'caption' in part:
-                        html_content.append(f'<p><em>{part["caption"]}</em></p>')
+                        ap('<p><em>')
+                        ap(part['caption'])
+                        ap('</em></p>')
 
             elif part['type'] == 'header':
                 level = part.get('level', 2)
-                html_content.append(f"<h{level}>{part['content']}</h{level}>")
+                ap(f"<h{level}>")
+                ap(part['content'])
+                ap(f"</h{level}>")
 
             elif part['type'] == 'list':
-                items = part['content']
-                html_content.append("<ul>")
-                for item in items:
-                    html_content.append(f"<li>{item}</li>")
-                html_content.append("</ul>")
+                ap("<ul>")
+                for item in part['content']:
+                    ap('<li>')
+                    ap(item)
+                    ap('</li>')
+                ap("</ul>")
 
-        # Объединяем весь HTML
-        full_html = "\n".join(html_content)
+        full_html = "".join(html_content)
 
         # Создаем страницу
         return self.publisher.create_page(
@@ -125,27 +254,18 @@ class TelegraphEnhancer:
         Returns:
             Результат создания статьи
         """
-        # Загружаем изображения
+        # Загружаем изображения параллельно, порядок сохраняется
+        existing = [p for p in image_paths if Path(p).exists()]
         image_urls = []
-        for img_path in image_paths:
-            if Path(img_path).exists():
-                url = self.upload_image(img_path)
-                if url:
-                    image_urls.append(url)
-                    print(f"Изображение загружено: {url}")
+        if existing:
+            with ThreadPoolExecutor(max_workers=min(8, len(existing))) as ex:
+                for url in ex.map(self.upload_image, existing):
+                    if url:
+                        image_urls.append(url)
+                        print(f"Изображение загружено: {url}")
 
         # Создаем части контента
-        content_parts = [
-            {
-                'type': 'header',
-                'content': 'Анарбилег "Cobrazera" Ууганбаяр: Будущее монгольского CS2',
-                'level': 1
-            },
-            {
-                'type': 'text',
-                'content': 'Молодой монгольский киберспортсмен, который ворвался в профессиональную сцену Counter-Strike 2 и уже показывает впечатляющие результаты в составе команды The MongolZ.'
-            }
-        ]
+        content_parts = list(_COBRAZERA_HEAD)
 
         # Добавляем первое изображение
         if image_urls:
@@ -155,39 +275,7 @@ class TelegraphEnhancer:
                 'caption': 'Анарбилег "Cobrazera" Ууганбаяр'
             })
 
-        # Основная информация
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '📊 Основная информация',
-                'level': 2
-            },
-            {
-                'type': 'list',
-                'content': [
-                    'Полное имя: Анарбилег Ууганбаяр',
-                    'Никнейм: Cobrazera',
-                    'Дата рождения: 3 августа 2005 года',
-                    'Национальность: Монголия',
-                    'Текущая команда: The MongolZ',
-                    'Позиция: Rifler',
-                    'Игра: Counter-Strike 2'
-                ]
-            }
-        ])
-
-        # Карьерный путь
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '🚀 Карьерный путь',
-                'level': 2
-            },
-            {
-                'type': 'text',
-                'content': 'Cobrazera начал свою профессиональную карьеру в 2024 году, играя за команду The Huns. В декабре 2025 года состоялся его переход в The MongolZ — ведущую монгольскую киберспортивную организацию, что стало важным этапом в его карьере.'
-            }
-        ])
+        content_parts.extend(_COBRAZERA_MID)
 
         # Добавляем второе изображение
         if len(image_urls) > 1:
@@ -197,90 +285,7 @@ class TelegraphEnhancer:
                 'caption': 'Cobrazera в составе The MongolZ'
             })
 
-        # Достижения
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '🏆 Достижения и статистика',
-                'level': 2
-            },
-            {
-                'type': 'text',
-                'content': 'По данным Esports Earnings, общий заработок Cobrazera составляет $15,700. Он участвовал в 6 турнирах и занимает 81 место в рейтинге монгольских игроков.'
-            },
-            {
-                'type': 'header',
-                'content': 'Ключевые турниры',
-                'level': 3
-            },
-            {
-                'type': 'list',
-                'content': [
-                    'MESA Pro Series Spring 2025 — 1 место ($1,100)',
-                    'ESL Challenger League Season 49: Asia — 3 место ($1,000)',
-                    'IESF World Championship 2024 — 5-8 место ($2,500)',
-                    'Asian Champions League 2025 — 5-6 место ($2,400)',
-                    'BLAST Open Spring 2025 — 13-16 место ($1,000)'
-                ]
-            }
-        ])
-
-        # Игровой стиль
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '🎯 Игровой стиль',
-                'level': 2
-            },
-            {
-                'type': 'text',
-                'content': 'Как rifler, Cobrazera специализируется на использовании винтовок (AK-47, M4A4). Эта позиция требует отличной точности, позиционирования и принятия быстрых решений. В возрасте 19 лет он показывает быструю адаптацию к новой команде и стабильные выступления на турнирах.'
-            }
-        ])
-
-        # Значение для монгольской сцены
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '🇲🇳 Значение для монгольской сцены',
-                'level': 2
-            },
-            {
-                'type': 'text',
-                'content': 'Cobrazera является частью нового поколения монгольских киберспортсменов, которые поднимают уровень региона на международной арене. The MongolZ уже доказали свою конкурентоспособность на азиатской сцене, и такие игроки как Cobrazera укрепляют позиции команды.'
-            }
-        ])
-
-        # Перспективы
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '✨ Перспективы',
-                'level': 2
-            },
-            {
-                'type': 'text',
-                'content': 'С учетом его возраста и текущего прогресса, Cobrazera имеет все шансы стать одним из ключевых игроков не только монгольской, но и азиатской сцены CS2 в ближайшие годы. Его карьера только начинается, и мы можем ожидать от него более значительных достижений на мировой арене.'
-            }
-        ])
-
-        # Источники
-        content_parts.extend([
-            {
-                'type': 'header',
-                'content': '📚 Источники',
-                'level': 2
-            },
-            {
-                'type': 'list',
-                'content': [
-                    'Liquipedia Counter-Strike Wiki',
-                    'HLTV.org',
-                    'Esports Earnings',
-                    'Prosettings.net'
-                ]
-            }
-        ])
+        content_parts.extend(_COBRAZERA_TAIL)
 
         # Создаем статью
         return self.create_enhanced_article(
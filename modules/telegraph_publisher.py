@@ -4,9 +4,83 @@
 """
 
 import requests
-import json
+import functools
 import os
-from typing import Optional, Dict, Any
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.fileio import json_dumps, json_loads
+
+
+REQUEST_TIMEOUT = 15  # seconds
+
+# Поля getAccountInfo по умолчанию, сериализованные один раз
+_DEFAULT_ACCOUNT_FIELDS = ("short_name", "author_name", "author_url", "auth_url", "page_count")
+_DEFAULT_ACCOUNT_FIELDS_JSON = json_dumps(list(_DEFAULT_ACCOUNT_FIELDS)).decode()
+
+# Разметка, которую понимает _markdown_to_html
+_HEADING = re.compile(r'(#{1,4}) (.*)')
+_LIST_ITEM = re.compile(r'[*-] (.*)')
+_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_ITALIC = re.compile(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)')
+
+
+def _inline(text: str) -> str:
+    """Жирный и курсив внутри строки (все пары, а не только первая)"""
+    # str.find-проверки в C отсекают строки, где соответствующей разметки быть не может
+    if '*' not in text:
+        return text
+    if '**' in text:
+        text = _BOLD.sub(r'<b>\1</b>', text)
+        if '*' not in text:
+            return text
+    return _ITALIC.sub(r'<i>\1</i>', text)
+
+
+def _make_session() -> requests.Session:
+    """Сессия с пулом keep-alive соединений и повторами при временных сбоях"""
+    # urllib3 повторяет POST только при ошибках соединения, так что страница не создастся дважды
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry))
+    return session
+
+
+@functools.lru_cache(maxsize=256)
+def _markdown_to_html(markdown: str) -> str:
+    """Markdown -> HTML для Telegra.ph; чистая функция, поэтому кэшируется по тексту"""
+    html = []
+    in_list = False
+
+    # Один проход: списки собираются в <ul> прямо по ходу
+    for line in markdown.split('\n'):
+        m = _LIST_ITEM.match(line)
+        if m:
+            if not in_list:
+                html.append('<ul>')
+                in_list = True
+            html.append(f'<li>{_inline(m.group(1))}</li>')
+            continue
+        if in_list:
+            html.append('</ul>')
+            in_list = False
+
+        m = _HEADING.match(line)
+        if m:
+            level = len(m.group(1))
+            html.append(f'<h{level}>{m.group(2)}</h{level}>')
+        elif not line.strip():
+            html.append('<br>')
+        else:
+            html.append(f'<p>{_inline(line)}</p>')
+
+    if in_list:
+        html.append('</ul>')
+
+    return ''.join(html)
+
 
 class TelegraphPublisher:
     """Класс для работы с Telegra.ph API"""
@@ -21,7 +95,7 @@ class TelegraphPublisher:
             access_token: Токен доступа Telegra.ph (можно получить через @Telegraph bot)
         """
         self.access_token = access_token
-        self.session = requests.Session()
+        self.session = _make_session()
 
     def create_account(self, short_name: str, author_name: str = "", author_url: str = "") -> Dict[str, Any]:
         """
@@ -42,8 +116,8 @@ class TelegraphPublisher:
             "author_url": author_url
         }
 
-        response = self.session.get(url, params=params)
-        return response.json()
+        response = self.session.post(url, data=params, timeout=REQUEST_TIMEOUT)
+        return json_loads(response.content)
 
     def create_page(
         self,
@@ -79,8 +153,8 @@ class TelegraphPublisher:
             "return_content": return_content
         }
 
-        response = self.session.get(url, params=params)
-        return response.json()
+        response = self.session.post(url, data=params, timeout=REQUEST_TIMEOUT)
+        return json_loads(response.content)
 
     def create_page_from_markdown(
         self,
@@ -107,6 +181,29 @@ class TelegraphPublisher:
         html_content = self._markdown_to_html(markdown_content)
         return self.create_page(title, html_content, author_name, author_url, return_content)
 
+    def create_pages_bulk(self, items: List[Dict[str, Any]], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Параллельное создание нескольких страниц
+
+        Args:
+            items: Список аргументов для create_page (title, content, ...)
+            max_workers: Сколько запросов выполнять одновременно
+
+        Returns:
+            Ответы API в том же порядке, что и items
+        """
+        def _create(item):
+            try:
+                return self.create_page(**item)
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+
+        if not items:
+            return []
+        # Запросы идут параллельно через пул keep-alive соединений общей сессии
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as ex:
+            return list(ex.map(_create, items))
+
     def _markdown_to_html(self, markdown: str) -> str:
         """
         Простое преобразование Markdown в HTML для Telegra.ph
@@ -117,62 +214,8 @@ class TelegraphPublisher:
         Returns:
             HTML строка
         """
-        # Преобразуем заголовки
-        lines = markdown.split('\n')
-        html_lines = []
-
-        for line in lines:
-            # Заголовки
-            if line.startswith('# '):
-                html_lines.append(f'<h1>{line[2:]}</h1>')
-            elif line.startswith('## '):
-                html_lines.append(f'<h2>{line[3:]}</h2>')
-            elif line.startswith('### '):
-                html_lines.append(f'<h3>{line[4:]}</h3>')
-            elif line.startswith('#### '):
-                html_lines.append(f'<h4>{line[5:]}</h4>')
-            # Жирный текст
-            elif '**' in line:
-                line = line.replace('**', '<b>', 1)
-                line = line.replace('**', '</b>', 1)
-                html_lines.append(f'<p>{line}</p>')
-            # Курсив
-            elif '*' in line and not line.startswith('* '):
-                line = line.replace('*', '<i>', 1)
-                line = line.replace('*', '</i>', 1)
-                html_lines.append(f'<p>{line}</p>')
-            # Списки
-            elif line.startswith('* '):
-                html_lines.append(f'<li>{line[2:]}</li>')
-            elif line.startswith('- '):
-                html_lines.append(f'<li>{line[2:]}</li>')
-            # Пустые строки
-            elif line.strip() == '':
-                html_lines.append('<br>')
-            # Обычный текст
-            else:
-                html_lines.append(f'<p>{line}</p>')
-
-        # Объединяем списки
-        html = []
-        in_list = False
-
-        for line in html_lines:
-            if line.startswith('<li>'):
-                if not in_list:
-                    html.append('<ul>')
-                    in_list = True
-                html.append(line)
-            else:
-                if in_list:
-                    html.append('</ul>')
-                    in_list = False
-                html.append(line)
-
-        if in_list:
-            html.append('</ul>')
-
-        return ''.join(html)
+        # Повторная публикация/правка того же текста берёт готовый HTML из кэша
+        return _markdown_to_html(markdown)
 
     def get_page(self, path: str, return_content: bool = True) -> Dict[str, Any]:
         """
@@ -191,8 +234,8 @@ class TelegraphPublisher:
             "return_content": return_content
         }
 
-        response = self.session.get(url, params=params)
-        return response.json()
+        response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        return json_loads(response.content)
 
     def edit_page(
         self,
@@ -231,15 +274,15 @@ class TelegraphPublisher:
             "return_content": return_content
         }
 
-        response = self.session.get(url, params=params)
-        return response.json()
+        response = self.session.post(url, data=params, timeout=REQUEST_TIMEOUT)
+        return json_loads(response.content)
 
-    def get_account_info(self, fields: list = ["short_name", "author_name", "author_url", "auth_url", "page_count"]) -> Dict[str, Any]:
+    def get_account_info(self, fields: Optional[list] = None) -> Dict[str, Any]:
         """
         Получение информации об аккаунте
 
         Args:
-            fields: Список полей для получения
+            fields: Список полей для получения (по умолчанию _DEFAULT_ACCOUNT_FIELDS)
 
         Returns:
             Словарь с информацией об аккаунте
@@ -250,11 +293,11 @@ class TelegraphPublisher:
         url = f"{self.BASE_URL}/getAccountInfo"
         params = {
             "access_token": self.access_token,
-            "fields": json.dumps(fields)
+            "fields": _DEFAULT_ACCOUNT_FIELDS_JSON if fields is None else json_dumps(fields).decode()
         }
 
-        response = self.session.get(url, params=params)
-        return response.json()
+        response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        return json_loads(response.content)
 
     def revoke_access_token(self) -> Dict[str, Any]:
         """
@@ -271,8 +314,8 @@ class TelegraphPublisher:
             "access_token": self.access_token
         }
 
-        response = self.session.get(url, params=params)
-        result = response.json()
+        response = self.session.post(url, data=params, timeout=REQUEST_TIMEOUT)
+        result = json_loads(response.content)
 
         if result.get("ok") and "access_token" in result.get("result", {}):
             self.access_token = result["result"]["access_token"]
@@ -1,22 +1,92 @@
 import requests
-import json
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.fileio import json_dumps, json_loads
+
+
+def _make_session():
+    """Сессия с пулом соединений; POST повторяется только при ошибках соединения"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry))
+    return session
+
+
+# Статичные части статьи о Cobrazera (между ними вставляются изображения)
+_COBRAZERA_HEAD = (
+    {"tag": "h3", "children": ["🎮 Анарбилег 'Cobrazera' Ууганбаяр"]},
+    {"tag": "p", "children": ["Будущее монгольского CS2"]},
+)
+
+_COBRAZERA_MID = (
+    # Основная информация
+    {"tag": "h4", "children": ["ℹ️ Основная информация"]},
+    {"tag": "ul", "children": [
+        {"tag": "li", "children": ["Полное имя: Анарбилег Ууганбаяр"]},
+        {"tag": "li", "children": ["Никнейм: Cobrazera"]},
+        {"tag": "li", "children": ["Дата рождения: 3 августа 2005 года"]},
+        {"tag": "li", "children": ["Национальность: Монголия"]},
+        {"tag": "li", "children": ["Текущая команда: The MongolZ"]},
+        {"tag": "li", "children": ["Позиция: Rifler"]},
+        {"tag": "li", "children": ["Игра: Counter-Strike 2"]}
+    ]},
+)
+
+_COBRAZERA_TAIL = (
+    # Достижения
+    {"tag": "h4", "children": ["🏆 Достижения"]},
+    {"tag": "ul", "children": [
+        {"tag": "li", "children": ["MESA Pro Series Spring 2025 — 1 место ($1,100)"]},
+        {"tag": "li", "children": ["ESL Challenger League Season 49: Asia — 3 место ($1,000)"]},
+        {"tag": "li", "children": ["IESF World Championship 2024 — 5-8 место ($2,500)"]},
+        {"tag": "li", "children": ["Asian Champions League 2025 — 5-6 место ($2,400)"]}
+    ]},
+
+    # Статистика
+    {"tag": "h4", "children": ["📊 Статистика"]},
+    {"tag": "ul", "children": [
+        {"tag": "li", "children": ["Общий заработок: $8,290"]},
+        {"tag": "li", "children": ["Количество турниров: 6"]},
+        {"tag": "li", "children": ["Рейтинг в Монголии: #81"]},
+        {"tag": "li", "children": ["Заработок в 2024: $2,790"]},
+        {"tag": "li", "children": ["Заработок в 2025: $5,500"]}
+    ]},
+
+    # Заключение
+    {"tag": "h4", "children": ["✨ Заключение"]},
+    {"tag": "p", "children": [
+        "Анарбилег 'Cobrazera' Ууганбаяр — восходящая звезда монгольского CS2. ",
+        "В возрасте 19 лет он уже показывает стабильные результаты на международной арене в составе The MongolZ. ",
+        "Его переход в топовую монгольскую команду и регулярные выступления на турнирах различного уровня ",
+        "свидетельствуют о серьезном подходе к карьере. Cobrazera представляет новое поколение монгольских ",
+        "киберспортсменов, которые укрепляют позиции региона на мировой арене."
+    ]},
+
+    # Хештеги
+    {"tag": "p", "children": [
+        {"tag": "strong", "children": ["#Cobrazera #CS2 #TheMongolZ #Монголия #Киберспорт #CounterStrike"]}
+    ]},
+)
+
 
 class TelegraphPublisher:
     def __init__(self, access_token):
         self.access_token = access_token
         self.base_url = "https://api.telegra.ph"
+        self.session = _make_session()
 
     def upload_image(self, image_path):
         """Загружает изображение на сервер Telegra.ph"""
         try:
             with open(image_path, 'rb') as f:
                 files = {'file': f}
-                response = requests.post(f'{self.base_url}/upload', files=files)
+                response = self.session.post(f'{self.base_url}/upload', files=files, timeout=30)
 
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 if result.get('ok'):
                     return result['result'][0]['src']
             return None
@@ -33,11 +103,11 @@ class TelegraphPublisher:
             "title": title,
             "author_name": author_name,
             "author_url": author_url,
-            "content": json.dumps(content_nodes)
+            "content": json_dumps(content_nodes).decode()
         }
 
-        response = requests.post(url, data=params)
-        return response.json()
+        response = self.session.post(url, data=params, timeout=15)
+        return json_loads(response.content)
 
     def create_cobrazera_article(self):
         """Создает статью о Cobrazera с изображениями"""
@@ -47,76 +117,31 @@ class TelegraphPublisher:
             "downloads/images/5193621219/Cobrazera_CS2_p_1.jpg"
         ]
 
+        # Загрузки независимы - идут параллельно через общую сессию, порядок сохраняется
+        existing = [p for p in image_paths if os.path.exists(p)]
         image_urls = []
-        for img_path in image_paths:
-            if os.path.exists(img_path):
-                img_url = self.upload_image(img_path)
-                if img_url:
-                    image_urls.append(img_url)
-                    print(f"Изображение загружено: {img_url}")
+        if existing:
+            with ThreadPoolExecutor(max_workers=min(8, len(existing))) as ex:
+                for img_url in ex.map(self.upload_image, existing):
+                    if img_url:
+                        image_urls.append(img_url)
+                        print(f"Изображение загружено: {img_url}")
 
         # Создаем контент с изображениями
-        content = []
-
-        # Заголовок
-        content.append({"tag": "h3", "children": ["🎮 Анарбилег 'Cobrazera' Ууганбаяр"]})
-        content.append({"tag": "p", "children": ["Будущее монгольского CS2"]})
+        content = list(_COBRAZERA_HEAD)
 
-        # Изображения
         if image_urls:
             content.append({"tag": "img", "attrs": {"src": image_urls[0]}})
             content.append({"tag": "p", "children": ["Фото: Cobrazera в составе The MongolZ"]})
 
-        # Основная информация
-        content.append({"tag": "h4", "children": ["ℹ️ Основная информация"]})
-        content.append({"tag": "ul", "children": [
-            {"tag": "li", "children": ["Полное имя: Анарбилег Ууганбаяр"]},
-            {"tag": "li", "children": ["Никнейм: Cobrazera"]},
-            {"tag": "li", "children": ["Дата рождения: 3 августа 2005 года"]},
-            {"tag": "li", "children": ["Национальность: Монголия"]},
-            {"tag": "li", "children": ["Текущая команда: The MongolZ"]},
-            {"tag": "li", "children": ["Позиция: Rifler"]},
-            {"tag": "li", "children": ["Игра: Counter-Strike 2"]}
-        ]})
+        content.extend(_COBRAZERA_MID)
 
         # Второе изображение
         if len(image_urls) > 1:
             content.append({"tag": "img", "attrs": {"src": image_urls[1]}})
             content.append({"tag": "p", "children": ["Cobrazera на турнире"]})
 
-        # Достижения
-        content.append({"tag": "h4", "children": ["🏆 Достижения"]})
-        content.append({"tag": "ul", "children": [
-            {"tag": "li", "children": ["MESA Pro Series Spring 2025 — 1 место ($1,100)"]},
-            {"tag": "li", "children": ["ESL Challenger League Season 49: Asia — 3 место ($1,000)"]},
-            {"tag": "li", "children": ["IESF World Championship 2024 — 5-8 место ($2,500)"]},
-            {"tag": "li", "children": ["Asian Champions League 2025 — 5-6 место ($2,400)"]}
-        ]})
-
-        # Статистика
-        content.append({"tag": "h4", "children": ["📊 Статистика"]})
-        content.append({"tag": "ul", "children": [
-            {"tag": "li", "children": ["Общий заработок: $8,290"]},
-            {"tag": "li", "children": ["Количество турниров: 6"]},
-            {"tag": "li", "children": ["Рейтинг в Монголии: #81"]},
-            {"tag": "li", "children": ["Заработок в 2024: $2,790"]},
-            {"tag": "li", "children": ["Заработок в 2025: $5,500"]}
-        ]})
-
-        # Заключение
-        content.append({"tag": "h4", "children": ["✨ Заключение"]})
-        content.append({"tag": "p", "children": [
-            "Анарбилег 'Cobrazera' Ууганбаяр — восходящая звезда монгольского CS2. ",
-            "В возрасте 19 лет он уже показывает стабильные результаты на международной арене в составе The MongolZ. ",
-            "Его переход в топовую монгольскую команду и регулярные выступления на турнирах различного уровня ",
-            "свидетельствуют о серьезном подходе к карьере. Cobrazera представляет новое поколение монгольских ",
-            "киберспортсменов, которые укрепляют позиции региона на мировой арене."
-        ]})
-
-        # Хештеги
-        content.append({"tag": "p", "children": [
-            {"tag": "strong", "children": ["#Cobrazera #CS2 #TheMongolZ #Монголия #Киберспорт #CounterStrike"]}
-        ]})
+        content.extend(_COBRAZERA_TAIL)
 
         # Создаем страницу
         result = self.create_page_with_images(
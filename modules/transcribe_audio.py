@@ -4,21 +4,21 @@ Audio transcription tool using Groq Whisper API
 
 import os
 import asyncio
-from groq import Groq
-import config
+from core.http import get_groq
 
 
-async def transcribe_audio_async(filepath: str) -> str:
+def transcribe_audio(filepath: str) -> str:
     """Transcribe audio file using Groq Whisper API"""
     try:
         if not os.path.exists(filepath):
             return "Error: File not found."
 
-        client = Groq(api_key=config.GROQ_API_KEY)
+        client = get_groq()  # Один клиент на процесс, общий с media
 
+        # Передаём сам файл, а не его содержимое - SDK читает его по частям
         with open(filepath, "rb") as file:
             transcription = client.audio.transcriptions.create(
-                file=(os.path.basename(filepath), file.read()),
+                file=(os.path.basename(filepath), file),
                 model="whisper-large-v3",
                 response_format="text",
             )
@@ -28,9 +28,6 @@ async def transcribe_audio_async(filepath: str) -> str:
         return f"Error transcribing audio: {str(e)}"
 
 
-def transcribe_audio(filepath: str) -> str:
-    """Synchronous wrapper for audio transcription"""
-    try:
-        return asyncio.run(transcribe_audio_async(filepath))
-    except Exception as e:
-        return f"Error running transcription: {str(e)}"
\ No newline at end of file
+async def transcribe_audio_async(filepath: str) -> str:
+    """Async wrapper: blocking SDK call runs in a worker thread, so several files can be gathered"""
+    return await asyncio.to_thread(transcribe_audio, filepath)
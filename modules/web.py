@@ -3,38 +3,197 @@ Web scraping module - ASYNC VERSION
 """
 
 import asyncio
+import atexit
+import os
+import random
+import re
+import shelve
+import threading
+import time
+from typing import Optional
 import aiohttp
 from bs4 import BeautifulSoup
+from core.http import get_session
 
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # Optional C parser; lxml or BeautifulSoup is the fallback
+    LexborHTMLParser = None
 
-async def visit_page(url: str) -> str:
-    """Visit webpage and extract text"""
+try:
+    import lxml.html
+    from lxml.etree import ParserError, strip_elements
+except ImportError:  # Optional C parser; BeautifulSoup is the fallback
+    lxml = None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Requests go through the shared pooled session (core.http), closed in post_shutdown
+_TIMEOUT = aiohttp.ClientTimeout(total=10)
+RETRY_ATTEMPTS = 3
+_RETRY_STATUSES = frozenset((502, 503, 504))
+MAX_BODY_BYTES = 2 * 1024 * 1024  # More than enough for the 5000 chars visit_page keeps
+
+# Results of previous fetches, revalidated with ETag/Last-Modified instead of re-downloaded
+WEB_CACHE_FILE = "data/web_cache"
+WEB_CACHE_TTL = 24 * 60 * 60  # seconds
+WEB_CACHE_MAX_ENTRIES = 256
+WEB_CACHE_MAX_TEXT = 256 * 1024  # characters; bigger results are fetched again instead
+_WEB_CACHE = None
+_WEB_CACHE_LOCK = threading.Lock()  # shelve is not safe across worker threads
+
+
+async def _get(url, headers=None):
+    """GET with exponential backoff on transient failures; use as `async with await _get(...)`"""
+    for attempt in range(RETRY_ATTEMPTS):
+        last = attempt == RETRY_ATTEMPTS - 1
+        try:
+            response = await get_session().get(
+                url, headers={"User-Agent": USER_AGENT, **(headers or {})}, timeout=_TIMEOUT
+            )
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if last:
+                raise
+        else:
+            if last or response.status not in _RETRY_STATUSES:
+                return response
+            response.release()
+        # 0.5s, 1s, ... with jitter so parallel callers don't retry in lockstep
+        await asyncio.sleep(min(4.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+async def _read_body(response, limit=MAX_BODY_BYTES):
+    """Read at most `limit` bytes of the body; returns (text, truncated)"""
+    buf = bytearray()
+    truncated = False
+    async for chunk in response.content.iter_chunked(65536):
+        buf += chunk
+        if len(buf) >= limit:
+            truncated = len(buf) > limit or not response.content.at_eof()
+            del buf[limit:]
+            break
+    return buf.decode(response.charset or "utf-8", errors="replace"), truncated
+
+
+def _web_cache():
+    global _WEB_CACHE
+    if _WEB_CACHE is None:
+        os.makedirs(os.path.dirname(WEB_CACHE_FILE), exist_ok=True)
+        _WEB_CACHE = shelve.open(WEB_CACHE_FILE)
+        atexit.register(_WEB_CACHE.close)
+    return _WEB_CACHE
+
+
+def _cache_get_sync(key):
+    with _WEB_CACHE_LOCK:
+        cache = _web_cache()
+        entry = cache.get(key)
+        if entry is not None and time.time() - entry["time"] > WEB_CACHE_TTL:
+            del cache[key]
+            entry = None
+        return entry
+
+
+def _cache_put_sync(key, entry):
+    with _WEB_CACHE_LOCK:
+        cache = _web_cache()
+        cache[key] = entry
+        if len(cache) > WEB_CACHE_MAX_ENTRIES:
+            # Drop the oldest entries (expired ones go first) down to 3/4 of the cap,
+            # so the full scan runs once per batch of stores rather than on every one
+            by_age = sorted(cache.keys(), key=lambda k: cache[k]["time"])
+            for old_key in by_age[: len(by_age) - WEB_CACHE_MAX_ENTRIES * 3 // 4]:
+                del cache[old_key]
+
+
+async def _cache_lookup(key):
+    """Fresh cache entry for key (or None) and the conditional headers to send"""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        entry = await asyncio.to_thread(_cache_get_sync, key)
+    except Exception as e:
+        print(f"Web cache read failed: {e}")
+        entry = None
+    if entry is None:
+        return None, {}
+    headers = {}
+    if entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return entry, headers
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, timeout=10) as response:
-                response.raise_for_status()
-                html = await response.text()
 
-                soup = BeautifulSoup(html, "html.parser")
+async def _cache_store(key, response, text):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    # Without validators the entry could never be revalidated; huge bodies aren't worth keeping
+    if not (etag or last_modified) or len(text) > WEB_CACHE_MAX_TEXT:
+        return
+    entry = {"etag": etag, "last_modified": last_modified, "text": text, "time": time.time()}
+    try:
+        await asyncio.to_thread(_cache_put_sync, key, entry)
+    except Exception as e:
+        print(f"Web cache write failed: {e}")
+
+
+# Line breaks (as str.splitlines sees them) or runs of 2+ spaces, with surrounding whitespace
+_TEXT_BREAKS = re.compile(r"\s*(?:[\n\r\v\f\x1c-\x1e\x85\u2028\u2029]| {2,})\s*")
+
+
+def _lxml_text(html: str) -> Optional[str]:
+    """Page text via lxml, or None if lxml rejects the document"""
+    try:
+        tree = lxml.html.fromstring(html)
+    except (ValueError, ParserError):
+        # str input with an <?xml encoding=...?> declaration, or nothing but comments/whitespace
+        return None
+    # One C-level pass drops the elements, text_content() collects the rest
+    strip_elements(tree, "script", "style", with_tail=False)
+    return tree.text_content()
+
 
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.extract()
+def _html_to_text(html: str) -> str:
+    """Visible page text without scripts/styles, one phrase per line"""
+    text = None
+    if LexborHTMLParser:
+        tree = LexborHTMLParser(html)
+        for node in tree.css("script, style"):
+            node.decompose()
+        root = tree.root
+        text = root.text() if root else ""
+    elif lxml:
+        text = _lxml_text(html)
 
-                text = soup.get_text()
+    if text is None:
+        soup = BeautifulSoup(html, "html.parser")
+        for script in soup(["script", "style"]):
+            script.extract()
+        text = soup.get_text()
 
-                # Clean up text
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (
-                    phrase.strip() for line in lines for phrase in line.split("  ")
-                )
-                text = "\n".join(chunk for chunk in chunks if chunk)
+    return "\n".join(filter(None, _TEXT_BREAKS.split(text.strip())))
 
-                return text[:5000] + "\n...(truncated)" if len(text) > 5000 else text
+
+async def visit_page(url: str) -> str:
+    """Visit webpage and extract text"""
+    try:
+        key = "page:" + url
+        entry, headers = await _cache_lookup(key)
+        async with await _get(url, headers) as response:
+            if entry and response.status == 304:
+                # Unchanged: the cached text skips both the download and the parse
+                text = entry["text"]
+                html = None
+            else:
+                response.raise_for_status()
+                # Only the beginning of a huge page ends up in the result anyway
+                html, _ = await _read_body(response)
+
+        if html is not None:
+            # Parse after the connection is back in the pool
+            text = _html_to_text(html)
+            await _cache_store(key, response, text)
+
+        return text[:5000] + "\n...(truncated)" if len(text) > 5000 else text
     except Exception as e:
         return f"Error visiting page: {str(e)}"
 
@@ -42,10 +201,18 @@ async def visit_page(url: str) -> str:
 async def fetch_url(url: str) -> str:
     """Fetch raw URL content"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as response:
-                response.raise_for_status()
-                return await response.text()
+        key = "raw:" + url
+        entry, headers = await _cache_lookup(key)
+        async with await _get(url, headers) as response:
+            if entry and response.status == 304:
+                return entry["text"]
+            response.raise_for_status()
+            if (response.content_length or 0) > MAX_BODY_BYTES:
+                return f"Error fetching URL: response too large ({response.content_length} bytes)"
+            text, truncated = await _read_body(response)
+            result = text + "\n...(truncated)" if truncated else text
+        await _cache_store(key, response, result)
+        return result
     except Exception as e:
         return f"Error fetching URL: {str(e)}"
 